@@ -0,0 +1,125 @@
+"""Manifest parsing micro-benchmark.
+
+Builds synthetic manifests of increasing size and compares parsing the whole
+document into a tree against the streaming parser in ``core.manifest``. For
+each size it reports total parse time, time to the first package and peak
+Python memory, and checks that both parsers return the same packages.
+
+    python benchmarks/parse.py
+    python benchmarks/parse.py --sizes 10 1000 100000 -n 3
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.manifest import iter_manifest
+
+READ_SIZE = 64 * 1024
+
+
+def make_manifest(packages, per_tag=5):
+    """Return a manifest with ``packages`` packages as UTF-8 bytes."""
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<titlepatch titleid="BENCH00000">']
+    for i in range(packages):
+        if i % per_tag == 0:
+            if i:
+                parts.append("</tag>")
+            parts.append(f'<tag name="T{i // per_tag:05d}" popup="true" signoff="true">')
+        parts.append(
+            f'<package version="{i // 100:02d}.{i % 100:02d}" size="{1048576 + i}" '
+            f'sha1sum="{i:040x}" url="http://example.invalid/pkg/{i}.pkg" ps3_system_ver="04.8000">'
+            f'<paramsfo><TITLE>Benchmark Title {i}</TITLE></paramsfo></package>'
+        )
+    if packages:
+        parts.append("</tag>")
+    parts.append("</titlepatch>")
+    return "".join(parts).encode("utf-8")
+
+
+def parse_tree(data, serial):
+    """Reference parser: build the whole tree, then walk it."""
+    root = ET.fromstring(data)
+    packages = []
+    for tag in root.findall("tag"):
+        for pkg in tag.findall("package"):
+            packages.append({
+                "title": pkg.findtext(".//TITLE"),
+                "tag": tag.attrib.get("name"),
+                "version": pkg.attrib.get("version"),
+                "size": int(pkg.attrib.get("size", 0)),
+                "url": pkg.attrib.get("url"),
+                "sha1": pkg.attrib.get("sha1sum"),
+                "serial": serial
+            })
+    return packages
+
+
+def chunks(data):
+    return (data[i:i + READ_SIZE] for i in range(0, len(data), READ_SIZE))
+
+
+def measure(parse, data):
+    """Return (total seconds, seconds to first package, packages)."""
+    start = time.perf_counter()
+    first = None
+    packages = []
+    for pkg in parse(data):
+        if first is None:
+            first = time.perf_counter() - start
+        packages.append(pkg)
+    total = time.perf_counter() - start
+    return total, first if first is not None else total, packages
+
+
+def peak_memory(parse, data):
+    tracemalloc.start()
+    try:
+        for _ in parse(data):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000, 100000],
+                        help="Package counts to generate")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="Runs per size")
+    args = parser.parse_args()
+
+    parsers = {
+        "tree": lambda data: parse_tree(data, "BENCH00000"),
+        "stream": lambda data: iter_manifest(chunks(data), "BENCH00000"),
+    }
+
+    print(f"{'packages':>9s} {'MB':>7s} {'parser':>7s} {'total ms':>10s} "
+          f"{'first ms':>10s} {'peak MB':>9s}")
+    failed = False
+    for size in args.sizes:
+        data = make_manifest(size)
+        results = {}
+        for name, parse in parsers.items():
+            runs = [measure(parse, data) for _ in range(args.runs)]
+            results[name] = runs[0][2]
+            total = statistics.median(run[0] for run in runs)
+            first = statistics.median(run[1] for run in runs)
+            peak = peak_memory(parse, data)
+            print(f"{size:9d} {len(data) / 1048576:7.2f} {name:>7s} {total * 1000:10.2f} "
+                  f"{first * 1000:10.3f} {peak / 1048576:9.2f}")
+        if results["tree"] != [pkg.to_dict() for pkg in results["stream"]]:
+            print(f"MISMATCH for {size} packages")
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
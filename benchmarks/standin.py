@@ -0,0 +1,196 @@
+"""Local stand-in for the update server, used by the transfer benchmarks.
+
+Serves synthetic manifests at ``/<serial>-ver.xml`` and synthetic package
+payloads at ``/pkg/<serial>-T<tag>-<n>.pkg``. Everything is generated from
+the serial, so runs are reproducible:
+
+    python benchmarks/standin.py --tags 2 --packages 3 --size 8388608 \\
+        --missing 0.1 --latency 20 --throttle 2048
+
+prints ``http://127.0.0.1:<port>`` on the first line and serves until killed.
+"""
+
+import argparse
+import hashlib
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BLOCK = bytes(range(256)) * 256  # 64 KB repeating payload pattern
+
+
+def payload_slice(start, end):
+    """Return payload bytes ``start``..``end`` (exclusive) of any package."""
+    offset = start % len(BLOCK)
+    out = bytearray()
+    while len(out) < end - start:
+        out += BLOCK[offset:offset + (end - start - len(out))]
+        offset = 0
+    return bytes(out)
+
+
+class StandinServer(ThreadingHTTPServer):
+    """HTTP server holding the synthetic catalogue parameters."""
+
+    daemon_threads = True
+
+    def __init__(self, address, tags=2, packages=3, size=4 * 1024 * 1024,
+                 missing=0.0, latency=0.0, throttle=0, ranges=True):
+        super().__init__(address, StandinHandler)
+        self.tags = tags
+        self.packages = packages
+        self.size = size
+        self.missing = missing
+        self.latency = latency
+        self.throttle = throttle
+        self.ranges = ranges
+        self._sha1 = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def is_missing(self, serial):
+        # Stable per serial so every run misses the same ones
+        return (zlib.crc32(serial.encode()) % 1000) < self.missing * 1000
+
+    def package_size(self, serial, tag, n):
+        # Vary sizes a little around the configured size
+        return max(1, self.size + (zlib.crc32(f"{serial}/{tag}/{n}".encode()) % 4096) - 2048)
+
+    def sha1(self, size):
+        with self._lock:
+            digest = self._sha1.get(size)
+        if digest is None:
+            h = hashlib.sha1()
+            for start in range(0, size, len(BLOCK)):
+                h.update(payload_slice(start, min(size, start + len(BLOCK))))
+            digest = h.hexdigest()
+            with self._lock:
+                self._sha1[size] = digest
+        return digest
+
+    def manifest(self, serial):
+        parts = [f'<?xml version="1.0" encoding="UTF-8"?>\n<titlepatch titleid="{serial}">']
+        for tag in range(self.tags):
+            parts.append(f'<tag name="{serial}_T{tag}" popup="true" signoff="true">')
+            for n in range(self.packages):
+                size = self.package_size(serial, tag, n)
+                parts.append(
+                    f'<package version="01.{tag:02d}{n:02d}" size="{size}" '
+                    f'sha1sum="{self.sha1(size)}" url="{self.base_url}/pkg/{serial}-T{tag}-{n}.pkg" '
+                    f'ps3_system_ver="04.8000"><paramsfo><TITLE>Synthetic {serial}</TITLE>'
+                    f'</paramsfo></package>'
+                )
+            parts.append("</tag>")
+        parts.append("</titlepatch>")
+        return "".join(parts).encode("utf-8")
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; don't let Nagle delay them
+    disable_nagle_algorithm = True
+    SEND_BLOCK = 64 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head=False):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        m = re.match(r"/(\w+)-ver\.xml$", self.path)
+        if m:
+            serial = m.group(1)
+            if server.is_missing(serial):
+                return self._send_empty(404)
+            body = server.manifest(serial)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/xml")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+            return
+
+        m = re.match(r"/pkg/(\w+)-T(\d+)-(\d+)\.pkg$", self.path)
+        if m:
+            size = server.package_size(m.group(1), int(m.group(2)), int(m.group(3)))
+            return self._send_payload(size, head)
+
+        self._send_empty(404)
+
+    def _send_empty(self, code):
+        self.send_response(code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_payload(self, size, head):
+        server = self.server
+        start, end = 0, size - 1
+        rng = self.headers.get("Range")
+        m = re.match(r"bytes=(\d+)-(\d*)$", rng or "")
+        if m and server.ranges:
+            start = int(m.group(1))
+            end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        if server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if head:
+            return
+
+        sent_at = time.monotonic()
+        position = start
+        while position <= end:
+            block_end = min(end + 1, position + self.SEND_BLOCK)
+            self.wfile.write(payload_slice(position, block_end))
+            position = block_end
+            if server.throttle:
+                # Pace each connection to the configured rate
+                due = sent_at + (position - start) / server.throttle
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=0, help="Port to listen on (0 picks one)")
+    parser.add_argument("--tags", type=int, default=2, help="Tags per serial")
+    parser.add_argument("--packages", type=int, default=3, help="Packages per tag")
+    parser.add_argument("--size", type=int, default=4 * 1024 * 1024, help="Approximate package size in bytes")
+    parser.add_argument("--missing", type=float, default=0.0, help="Fraction of serials without a manifest")
+    parser.add_argument("--latency", type=float, default=0.0, help="Added latency per request in ms")
+    parser.add_argument("--throttle", type=int, default=0, help="Per-connection payload rate in KB/s (0 = unlimited)")
+    parser.add_argument("--no-ranges", action="store_true", help="Ignore Range requests")
+    args = parser.parse_args()
+
+    server = StandinServer(
+        ("127.0.0.1", args.port), tags=args.tags, packages=args.packages,
+        size=args.size, missing=args.missing, latency=args.latency / 1000,
+        throttle=args.throttle * 1024, ranges=not args.no_ranges
+    )
+    print(server.base_url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Startup timing harness for the PKG Fetcher GUI.
+
+Launches the application in fresh interpreters and measures how long it takes
+to import ``main`` and to paint the main window for the first time. It also
+checks that networking, XML and worker modules are still unloaded at first
+paint.
+
+    python benchmarks/startup.py                 # measure and compare
+    python benchmarks/startup.py --save-baseline # record a new baseline
+
+Set QT_QPA_PLATFORM=offscreen to run without a display.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+
+# Modules that must not be imported before the window is painted
+LAZY_MODULES = [
+    "requests",
+    "xml.etree.ElementTree",
+    "ui.FetchThread",
+    "ui.DownloadThread",
+    "ui.ConfigDialog",
+    "core.batch",
+    "core.http_client",
+]
+
+
+def child():
+    """Run inside a fresh interpreter: start the GUI and report timings as JSON."""
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QObject, QEvent, QTimer
+
+    app = QApplication(sys.argv)
+    qt_ready = time.perf_counter()
+
+    import main
+    imported = time.perf_counter()
+
+    result = {}
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and "first_paint" not in result:
+                result["first_paint"] = time.perf_counter() - start
+                result["loaded"] = [name for name in LAZY_MODULES if name in sys.modules]
+                QTimer.singleShot(0, app.quit)
+            return False
+
+    win = main.PKGFetcher()
+    paint_filter = FirstPaint()
+    win.installEventFilter(paint_filter)
+    win.show()
+    QTimer.singleShot(10000, app.quit)
+    app.exec_()
+
+    result["qt_init"] = qt_ready - start
+    result["import_main"] = imported - qt_ready
+    print(json.dumps(result))
+
+
+def run_once():
+    with tempfile.TemporaryDirectory() as cwd:
+        # A configured server keeps the startup warning dialog out of the way
+        with open(os.path.join(cwd, "config.json"), "w") as f:
+            json.dump({"server": {"xml_url": "http://127.0.0.1/{s}.xml"}}, f)
+
+        begin = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child"],
+            cwd=cwd, capture_output=True, text=True, check=True
+        )
+        wall = time.perf_counter() - begin
+
+    lines = [line for line in out.stdout.splitlines() if line.startswith("{")]
+    if not lines:
+        raise RuntimeError(f"Child produced no result:\n{out.stderr}")
+    result = json.loads(lines[-1])
+    if "first_paint" not in result:
+        raise RuntimeError("Main window was never painted")
+    result["process_to_paint"] = wall
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("-n", "--runs", type=int, default=5, help="Number of launches")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown over the baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store the measured medians as the new baseline")
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return 0
+
+    runs = [run_once() for _ in range(args.runs)]
+    metrics = ["import_main", "first_paint", "process_to_paint"]
+    medians = {name: statistics.median(run[name] for run in runs) for name in metrics}
+
+    for name in metrics:
+        print(f"{name:18s} {medians[name] * 1000:8.1f} ms")
+
+    failed = False
+    loaded = sorted({name for run in runs for name in run["loaded"]})
+    if loaded:
+        print(f"Loaded before first paint: {', '.join(loaded)}")
+        failed = True
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(medians, f, indent=2)
+        print(f"Baseline saved to {BASELINE_FILE}")
+    elif os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "r") as f:
+            baseline = json.load(f)
+        for name in metrics:
+            if name not in baseline:
+                continue
+            limit = baseline[name] * (1 + args.tolerance)
+            if medians[name] > limit:
+                print(f"REGRESSION {name}: {medians[name] * 1000:.1f} ms "
+                      f"> {limit * 1000:.1f} ms allowed")
+                failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""Fetch and download benchmarks against a local stand-in server.
+
+Starts ``benchmarks/standin.py`` with a synthetic catalogue, then runs the
+real fetch and download paths of ``core.batch`` headlessly in fresh
+interpreters and reports throughput, per-item latency percentiles and
+peak memory.
+
+    python benchmarks/transfer.py                  # measure and compare
+    python benchmarks/transfer.py --save-baseline  # record a new baseline
+    python benchmarks/transfer.py --only fetch --serials 500 --latency 30
+
+A run is only compared with a baseline recorded with the same scenario
+options.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BASELINE_FILE = os.path.join(HERE, "transfer_baseline.json")
+
+SCENARIOS = ("fetch", "download")
+
+# Options that change what is measured; baselines only compare like with like
+SCENARIO_OPTIONS = ("serials", "tags", "packages", "size", "missing", "latency",
+                    "throttle", "no_ranges", "workers", "concurrent", "segments")
+
+# Metrics compared with the baseline and whether higher is better
+METRICS = {
+    "throughput": True,
+    "p50": False,
+    "p90": False,
+    "p99": False,
+    "peak_rss_mb": False,
+}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def serial_names(count):
+    return [f"BENCH{n:05d}" for n in range(count)]
+
+
+def child(args):
+    """Run one scenario in this interpreter and print the result as JSON."""
+    sys.path.insert(0, ROOT)
+
+    from config import Settings
+    from core import batch
+    from core.downloader import PackageDownloader
+
+    output = tempfile.mkdtemp(prefix="pkg-bench-")
+    settings = Settings(
+        xml_url=args.url + "/{s}-ver.xml",
+        max_workers=args.workers,
+        max_per_host=args.workers,
+        pool_size=max(args.workers, args.concurrent * args.segments),
+        output_directory=output,
+        concurrent_downloads=args.concurrent,
+        segments=args.segments,
+        skip_existing=False,
+        cache_enabled=False,
+        cache_directory=os.path.join(output, ".cache"),
+    )
+    latencies = []
+
+    def timed(func):
+        def wrapper(*a, **kw):
+            start = time.perf_counter()
+            try:
+                return func(*a, **kw)
+            finally:
+                latencies.append(time.perf_counter() - start)
+        return wrapper
+
+    try:
+        fetcher = batch.build_fetcher(settings)
+        if args.child == "fetch":
+            fetcher.fetch_one = timed(fetcher.fetch_one)
+            start = time.perf_counter()
+            packages = fetcher.fetch_all(serial_names(args.serials))
+            elapsed = time.perf_counter() - start
+            result = {"items": len(packages), "throughput": args.serials / elapsed,
+                      "unit": "serials/s"}
+        else:
+            # Manifests are fetched first so only the transfers are timed
+            packages = fetcher.fetch_all(serial_names(args.serials))
+            PackageDownloader.download = timed(PackageDownloader.download)
+            start = time.perf_counter()
+            saved = batch.download_packages(packages, settings)
+            elapsed = time.perf_counter() - start
+            result = {"items": len(packages), "bytes": saved,
+                      "throughput": saved / elapsed / (1024 * 1024), "unit": "MB/s"}
+    finally:
+        shutil.rmtree(output, ignore_errors=True)
+
+    result["elapsed"] = elapsed
+    if latencies:
+        for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+            result[name] = percentile(latencies, fraction) * 1000
+    result["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(result))
+
+
+def start_standin(args):
+    command = [
+        sys.executable, os.path.join(HERE, "standin.py"),
+        "--tags", str(args.tags), "--packages", str(args.packages),
+        "--size", str(args.size), "--missing", str(args.missing),
+        "--latency", str(args.latency), "--throttle", str(args.throttle),
+    ]
+    if args.no_ranges:
+        command.append("--no-ranges")
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    url = server.stdout.readline().strip()
+    if not url.startswith("http"):
+        server.kill()
+        raise RuntimeError("Stand-in server did not start")
+    return server, url
+
+
+def run_once(scenario, args, url):
+    command = [sys.executable, os.path.abspath(__file__), "--child", scenario, "--url", url]
+    for name in SCENARIO_OPTIONS:
+        value = getattr(args, name)
+        if isinstance(value, bool):
+            if value:
+                command.append("--" + name.replace("_", "-"))
+        else:
+            command += ["--" + name.replace("_", "-"), str(value)]
+    out = subprocess.run(command, capture_output=True, text=True, check=True)
+    lines = [line for line in out.stdout.splitlines() if line.startswith("{")]
+    if not lines:
+        raise RuntimeError(f"Child produced no result:\n{out.stderr}")
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--only", choices=SCENARIOS, help="Run a single scenario")
+    parser.add_argument("-n", "--runs", type=int, default=3, help="Runs per scenario")
+    parser.add_argument("--serials", type=int, default=200, help="Serials to fetch")
+    parser.add_argument("--tags", type=int, default=2, help="Tags per serial")
+    parser.add_argument("--packages", type=int, default=2, help="Packages per tag")
+    parser.add_argument("--size", type=int, default=256 * 1024, help="Approximate package size in bytes")
+    parser.add_argument("--missing", type=float, default=0.1, help="Fraction of serials without a manifest")
+    parser.add_argument("--latency", type=float, default=5.0, help="Server latency per request in ms")
+    parser.add_argument("--throttle", type=int, default=0, help="Per-connection rate in KB/s (0 = unlimited)")
+    parser.add_argument("--no-ranges", action="store_true", help="Server ignores Range requests")
+    parser.add_argument("--workers", type=int, default=8, help="Manifest fetch workers")
+    parser.add_argument("--concurrent", type=int, default=3, help="Concurrent downloads")
+    parser.add_argument("--segments", type=int, default=1, help="Segments per download")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed regression over the baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store the measured medians as the new baseline")
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return 0
+
+    options = {name: getattr(args, name) for name in SCENARIO_OPTIONS}
+    scenarios = [args.only] if args.only else list(SCENARIOS)
+    server, url = start_standin(args)
+    try:
+        results = {}
+        for scenario in scenarios:
+            runs = [run_once(scenario, args, url) for _ in range(args.runs)]
+            medians = {
+                name: statistics.median(run[name] for run in runs)
+                for name in METRICS if all(run.get(name) is not None for run in runs)
+            }
+            results[scenario] = medians
+            unit = runs[0]["unit"]
+            print(f"{scenario}: {runs[0]['items']} item(s), "
+                  f"{medians['throughput']:.1f} {unit}, "
+                  f"p50 {medians.get('p50', 0):.1f} ms, p90 {medians.get('p90', 0):.1f} ms, "
+                  f"p99 {medians.get('p99', 0):.1f} ms, "
+                  f"peak {medians.get('peak_rss_mb', 0):.1f} MB")
+    finally:
+        server.kill()
+        server.wait()
+
+    failed = False
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE, "r") as f:
+                baseline = json.load(f)
+        for scenario, medians in results.items():
+            baseline[scenario] = {"options": options, "metrics": medians}
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline saved to {BASELINE_FILE}")
+    elif os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "r") as f:
+            baseline = json.load(f)
+        for scenario, medians in results.items():
+            stored = baseline.get(scenario)
+            if not stored:
+                continue
+            if stored["options"] != options:
+                print(f"Baseline for {scenario} used other options; not compared")
+                continue
+            for name, higher_is_better in METRICS.items():
+                if name not in medians or name not in stored["metrics"]:
+                    continue
+                reference = stored["metrics"][name]
+                if higher_is_better:
+                    limit = reference / (1 + args.tolerance)
+                    regressed = medians[name] < limit
+                else:
+                    limit = reference * (1 + args.tolerance)
+                    regressed = medians[name] > limit
+                if regressed:
+                    print(f"REGRESSION {scenario} {name}: {medians[name]:.1f} "
+                          f"vs {limit:.1f} allowed")
+                    failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
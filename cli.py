@@ -0,0 +1,210 @@
+import argparse
+import itertools
+import multiprocessing
+import sys
+
+from config import Config
+from core.batch import (
+    audit_library, configure_logging, download_packages, fetch_packages, scan_serials,
+    search_catalog, stream_packages
+)
+from core.logbuffer import LogBuffer
+from core.progress import format_bytes, format_duration
+from core.serials import expand_serials, read_id_file, unique_serials
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Fetch and download update packages without the GUI."
+    )
+    parser.add_argument("serials", nargs="*",
+                        help="Serials or serial ranges to fetch, e.g. NPUA80490 or NPUA80000-NPUA80999")
+    parser.add_argument("-f", "--id-file",
+                        help="File with serials or ranges, one per line, read while fetching")
+    parser.add_argument("-o", "--output", help="Output directory (overrides config)")
+    parser.add_argument("-c", "--config", help="Path to config.json")
+    parser.add_argument("--xml-url", help="XML URL template (overrides config)")
+    parser.add_argument("-j", "--jobs", type=int, help="Concurrent downloads (overrides config)")
+    parser.add_argument("--limit-rate", type=int, metavar="KBPS",
+                        help="Bandwidth limit in KB/s for all downloads (overrides config)")
+    parser.add_argument("--retries", type=int, metavar="N",
+                        help="Retries of timeouts and server errors (overrides config)")
+    parser.add_argument("-l", "--list-only", action="store_true",
+                        help="Only list the packages found as they arrive, do not download")
+    parser.add_argument("--scan", action="store_true",
+                        help="Only record the manifests in the local catalog")
+    parser.add_argument("--search", metavar="TEXT",
+                        help="List catalogued packages matching TEXT without going online")
+    parser.add_argument("--audit", action="store_true",
+                        help="Check the output directory against the catalog and exit")
+    parser.add_argument("--full", action="store_true",
+                        help="With --audit, hash every file instead of only changed ones")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print errors")
+    parser.add_argument("--log-file", help="Also write a JSON-lines log to this file")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="Write each batch's phase timings next to FILE, with -fetch, -scan "
+                             "or -download added to the name (.csv for CSV, else JSON)")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="Serve metrics on http://127.0.0.1:PORT/metrics while running")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="Profile the fetch and download workers into DIR")
+    return parser.parse_args(argv)
+
+
+def read_serials(args):
+    """Yield the serials of the command line and the ID file lazily, once each."""
+    serials = expand_serials(args.serials)
+    if args.id_file:
+        serials = itertools.chain(serials, read_id_file(args.id_file))
+    return unique_serials(serials)
+
+
+def print_packages(packages):
+    for pkg in packages:
+        print(f"{pkg.serial}\t{pkg.tag}\t{pkg.version}\t"
+              f"{pkg.size / 1024 / 1024:.2f} MB\t{pkg.title}\t{pkg.url}")
+
+
+def audit(args):
+    settings = Config.current()
+    if args.output:
+        settings = settings.replace(output_directory=args.output)
+    configure_logging(settings)
+    echo = (lambda msg: None) if args.quiet else print
+    log = LogBuffer(lambda lines: echo("\n".join(lines)), source="cli")
+    try:
+        report = audit_library(settings, log=log.write, incremental=not args.full)
+    except Exception as e:
+        log.flush()
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    log.flush()
+    return 1 if report.problems or report.unreadable else 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.config:
+        Config.CONFIG_FILE = args.config
+
+    if args.audit:
+        return audit(args)
+
+    if args.search is not None:
+        try:
+            packages = search_catalog(args.search, Config.current())
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print_packages(packages)
+        return 0 if packages else 1
+
+    # Only the first serial is read up front; the rest stream from the file
+    serials = read_serials(args)
+    try:
+        first = next(serials, None)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    if first is None:
+        print("No serials given.", file=sys.stderr)
+        return 2
+    serials = itertools.chain([first], serials)
+
+    overrides = {
+        "xml_url": args.xml_url,
+        "output_directory": args.output,
+        "concurrent_downloads": args.jobs,
+        "log_file": args.log_file,
+        "rate_limit": args.limit_rate and args.limit_rate * 1024,
+        "metrics_report": args.metrics,
+        "metrics_port": args.metrics_port,
+        "metrics_profile": args.profile,
+    }
+    settings = Config.current().replace(
+        **{name: value for name, value in overrides.items() if value}
+    )
+    if args.retries is not None:
+        # 0 is a meaningful override here
+        settings = settings.replace(retries=args.retries)
+
+    if not Config.is_server_configured(settings):
+        print(
+            "Server URL is not configured. Set server.xml_url in "
+            f"{Config.CONFIG_FILE} or pass --xml-url.",
+            file=sys.stderr
+        )
+        return 2
+
+    configure_logging(settings)
+    echo = (lambda msg: None) if args.quiet else print
+    log = LogBuffer(lambda lines: echo("\n".join(lines)), source="cli")
+
+    if args.scan:
+        try:
+            scan_serials(serials, settings, log=log.write)
+        except Exception as e:
+            log.flush()
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        log.flush()
+        return 0
+
+    if args.list_only:
+        def show(packages):
+            log.flush()
+            print_packages(packages)
+
+        try:
+            stream_packages(serials, settings, log=log.write, on_batch=show)
+        except Exception as e:
+            log.flush()
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        log.flush()
+        return 0
+
+    try:
+        packages = fetch_packages(serials, settings, log=log.write)
+    except Exception as e:
+        log.flush()
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    log.flush()
+
+    def show_progress(snapshot):
+        if args.quiet or not sys.stderr.isatty():
+            return
+        print(
+            f"\r{snapshot['percent']:3d}%  {format_bytes(snapshot['done'])} / "
+            f"{format_bytes(snapshot['total'])}  {format_bytes(snapshot['speed'])}/s  "
+            f"ETA {format_duration(snapshot['eta'])}   ",
+            end="", file=sys.stderr, flush=True
+        )
+
+    failed = []
+    try:
+        downloaded_size = download_packages(
+            packages, settings, log=log.write, on_progress=show_progress,
+            on_failure=lambda pkg, reason: failed.append(pkg)
+        )
+    except Exception as e:
+        log.flush()
+        print(f"\nError: {e}", file=sys.stderr)
+        return 1
+
+    if not args.quiet and sys.stderr.isatty():
+        print(file=sys.stderr)
+    log.write(f"Total downloaded: {downloaded_size / 1024 / 1024:.2f} MB")
+    log.flush()
+    if failed:
+        print(f"{len(failed)} package(s) failed to download.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,78 +1,341 @@
+import copy
 import json
 import os
+import threading
+import time
 from pathlib import Path
+from types import MappingProxyType
+
+
+class Settings:
+    """Immutable, validated snapshot of the configuration.
+
+    Values are flat attributes (``settings.timeout``, ``settings.cache_ttl``)
+    so reading them on a hot path is a plain attribute lookup. Invalid or
+    missing values fall back to the defaults with a warning.
+    """
+
+    # Attribute name -> (config section, key)
+    FIELDS = {
+        "xml_url": ("server", "xml_url"),
+        "timeout": ("server", "timeout"),
+        "verify_ssl": ("server", "verify_ssl"),
+        "max_workers": ("server", "max_workers"),
+        "max_per_host": ("server", "max_per_host"),
+        "pool_size": ("server", "pool_size"),
+        "retries": ("server", "retries"),
+        "breaker_threshold": ("server", "breaker_threshold"),
+        "breaker_cooldown": ("server", "breaker_cooldown"),
+        "chunk_size": ("download", "chunk_size"),
+        "output_directory": ("download", "output_directory"),
+        "concurrent_downloads": ("download", "concurrent_downloads"),
+        "queue_order": ("download", "queue_order"),
+        "segments": ("download", "segments"),
+        "skip_existing": ("download", "skip_existing"),
+        "verify_checksum": ("download", "verify_checksum"),
+        "preallocate": ("download", "preallocate"),
+        "rate_limit": ("download", "rate_limit"),
+        "host_rate_limits": ("download", "host_rate_limits"),
+        "cache_enabled": ("cache", "enabled"),
+        "cache_directory": ("cache", "directory"),
+        "cache_ttl": ("cache", "ttl"),
+        "cache_negative_ttl": ("cache", "negative_ttl"),
+        "cache_max_size_mb": ("cache", "max_size_mb"),
+        "catalog_file": ("cache", "catalog"),
+        "log_max_lines": ("log", "max_lines"),
+        "log_file": ("log", "file"),
+        "log_file_max_mb": ("log", "file_max_mb"),
+        "log_file_backups": ("log", "file_backups"),
+        "metrics_report": ("metrics", "report"),
+        "metrics_port": ("metrics", "port"),
+        "metrics_profile": ("metrics", "profile"),
+    }
+
+    # Smallest accepted value of numeric settings (default 1)
+    MINIMUM = {
+        "retries": 0,
+        "breaker_threshold": 0,
+        "chunk_size": 0,
+        "rate_limit": 0,
+        "cache_ttl": 0,
+        "cache_negative_ttl": 0,
+        "log_file_backups": 0,
+        "metrics_port": 0,
+    }
+
+    CHOICES = {
+        "queue_order": ("input", "smallest", "largest"),
+    }
+
+    __slots__ = tuple(FIELDS)
+
+    def __init__(self, **values):
+        unknown = set(values) - set(self.FIELDS)
+        if unknown:
+            raise TypeError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        for name, (section, key) in self.FIELDS.items():
+            default = Config.DEFAULT_CONFIG[section][key]
+            value = values.get(name, default)
+            if not self._valid(name, value, default):
+                print(f"Invalid config value {section}.{key}={value!r}. Using {default!r}.")
+                value = default
+            if isinstance(value, dict):
+                value = MappingProxyType(dict(value))
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def _valid(cls, name, value, default):
+        if isinstance(default, dict):
+            # Mappings of name -> non-negative int, e.g. per-host rate limits
+            return (isinstance(value, (dict, MappingProxyType)) and all(
+                isinstance(k, str) and isinstance(v, int) and not isinstance(v, bool) and v >= 0
+                for k, v in value.items()
+            ))
+        if isinstance(default, bool):
+            return isinstance(value, bool)
+        if isinstance(default, int):
+            return (isinstance(value, int) and not isinstance(value, bool)
+                    and value >= cls.MINIMUM.get(name, 1))
+        if not isinstance(value, str):
+            return False
+        return name not in cls.CHOICES or value in cls.CHOICES[name]
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build settings from a nested config dict as stored in config.json."""
+        values = {}
+        for name, (section, key) in cls.FIELDS.items():
+            section_data = data.get(section)
+            if isinstance(section_data, dict) and key in section_data:
+                values[name] = section_data[key]
+        return cls(**values)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Settings are read-only; use replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError("Settings are read-only")
+
+    def __eq__(self, other):
+        if not isinstance(other, Settings):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.FIELDS)
+
+    def __hash__(self):
+        return hash(tuple(
+            frozenset(value.items()) if isinstance(value, MappingProxyType) else value
+            for value in (getattr(self, name) for name in self.FIELDS)
+        ))
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"Settings({values})"
+
+    def replace(self, **changes):
+        """Return a copy with some values changed."""
+        values = {name: getattr(self, name) for name in self.FIELDS}
+        values.update(changes)
+        return Settings(**values)
+
+    def section(self, section):
+        """Return one config section as a new dict."""
+        return {
+            key: self._plain(name)
+            for name, (sec, key) in self.FIELDS.items() if sec == section
+        }
+
+    def as_dict(self):
+        """Return the settings as a new nested config dict."""
+        data = {}
+        for name, (section, key) in self.FIELDS.items():
+            data.setdefault(section, {})[key] = self._plain(name)
+        return data
+
+    def _plain(self, name):
+        value = getattr(self, name)
+        return dict(value) if isinstance(value, MappingProxyType) else value
+
 
 class Config:
-    """Configuration manager for PKG Fetcher."""
-    
+    """Configuration manager for PKG Fetcher.
+
+    The file is read once into a cached Settings object. It is re-read when
+    ``save()`` is called or when its modification time changes, which is
+    checked at most every ``CHECK_INTERVAL`` seconds; subscribers are called
+    with the new Settings whenever the values change.
+    """
+
     CONFIG_FILE = "config.json"
     DEFAULT_CONFIG = {
         "server": {
             "xml_url": "",
             "timeout": 15,
-            "verify_ssl": False
+            "verify_ssl": False,
+            "max_workers": 8,
+            "max_per_host": 4,
+            "pool_size": 10,
+            "retries": 3,  # retries of timeouts and server errors
+            "breaker_threshold": 5,  # failures in a row that pause a host, 0 = never
+            "breaker_cooldown": 30  # seconds before a paused host is tried again
         },
         "download": {
-            "chunk_size": 1048576,  # 1 MB
-            "output_directory": "pkgs"
+            "chunk_size": 0,  # bytes, 0 = tuned automatically per host
+            "output_directory": "pkgs",
+            "concurrent_downloads": 3,
+            "queue_order": "input",
+            "segments": 4,
+            "skip_existing": True,
+            "verify_checksum": True,
+            "preallocate": False,
+            "rate_limit": 0,  # bytes per second, 0 = unlimited
+            "host_rate_limits": {}  # host -> bytes per second
+        },
+        "cache": {
+            "enabled": True,
+            "directory": "cache",
+            "ttl": 86400,  # 1 day
+            "negative_ttl": 3600,  # 1 hour
+            "max_size_mb": 64,
+            "catalog": "catalog.db"  # in the cache directory, empty disables
+        },
+        "log": {
+            "max_lines": 5000,
+            "file": "",  # empty disables the log file
+            "file_max_mb": 5,
+            "file_backups": 3
+        },
+        "metrics": {
+            "report": "",  # JSON (or .csv) timing report per batch kind, empty disables
+            "port": 0,  # serve /metrics on 127.0.0.1 at this port, 0 disables
+            "profile": ""  # directory for cProfile dumps of each batch, empty disables
         }
     }
-    
+
+    # Seconds between checks of the config file's modification time
+    CHECK_INTERVAL = 1.0
+
+    _settings = None
+    _stamp = None
+    _checked_at = 0.0
+    _subscribers = []
+    _lock = threading.Lock()
+
     @classmethod
-    def load(cls):
-        """Load configuration from config.json or use defaults."""
+    def current(cls):
+        """Return the cached Settings, reloading them if the file has changed."""
+        settings = cls._settings
+        if (settings is not None and cls._stamp[0] == cls.CONFIG_FILE
+                and time.monotonic() - cls._checked_at < cls.CHECK_INTERVAL):
+            return settings
+        return cls.reload()
+
+    @classmethod
+    def reload(cls, force=False):
+        """Re-read the config file if it changed (always when ``force``)."""
+        with cls._lock:
+            cls._checked_at = time.monotonic()
+            stamp = cls._file_stamp()
+            old = cls._settings
+            if old is not None and not force and stamp == cls._stamp:
+                return old
+            cls._settings = new = Settings.from_dict(cls._read())
+            cls._stamp = stamp
+            subscribers = list(cls._subscribers)
+
+        if old is not None and new != old:
+            for callback in subscribers:
+                callback(new)
+        return new
+
+    @classmethod
+    def subscribe(cls, callback):
+        """Call ``callback(settings)`` whenever the settings change."""
+        with cls._lock:
+            cls._subscribers.append(callback)
+
+    @classmethod
+    def unsubscribe(cls, callback):
+        with cls._lock:
+            if callback in cls._subscribers:
+                cls._subscribers.remove(callback)
+
+    @classmethod
+    def _file_stamp(cls):
+        try:
+            st = os.stat(cls.CONFIG_FILE)
+        except OSError:
+            return (cls.CONFIG_FILE, None, None)
+        return (cls.CONFIG_FILE, st.st_mtime_ns, st.st_size)
+
+    @classmethod
+    def _read(cls):
         if os.path.exists(cls.CONFIG_FILE):
             try:
                 with open(cls.CONFIG_FILE, 'r') as f:
-                    return json.load(f)
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    return data
+                print("Error loading config file: not a JSON object. Using defaults.")
             except (json.JSONDecodeError, IOError) as e:
                 print(f"Error loading config file: {e}. Using defaults.")
-                return cls.DEFAULT_CONFIG
+            return copy.deepcopy(cls.DEFAULT_CONFIG)
         else:
             # Create default config file
-            cls.save(cls.DEFAULT_CONFIG)
-            return cls.DEFAULT_CONFIG
+            cls._write(cls.DEFAULT_CONFIG)
+            return copy.deepcopy(cls.DEFAULT_CONFIG)
+
+    @classmethod
+    def load(cls):
+        """Return the configuration as a new nested dict that is safe to modify."""
+        return cls.current().as_dict()
     
     @classmethod
     def save(cls, config_data):
-        """Save configuration to config.json."""
+        """Save configuration to config.json and refresh the cached settings."""
+        if cls._write(config_data):
+            cls.reload(force=True)
+
+    @classmethod
+    def _write(cls, config_data):
         try:
             with open(cls.CONFIG_FILE, 'w') as f:
                 json.dump(config_data, f, indent=2)
+            return True
         except IOError as e:
             print(f"Error saving config file: {e}")
+            return False
+
+    @classmethod
+    def settings_for(cls, config=None):
+        """Return ``config`` as Settings: the cached settings for None, validated for a dict."""
+        if config is None:
+            return cls.current()
+        if isinstance(config, Settings):
+            return config
+        return Settings.from_dict(config)
     
     @classmethod
     def get_xml_url(cls, config=None):
         """Get the XML URL template from config."""
-        if config is None:
-            config = cls.load()
-        return config["server"]["xml_url"]
+        return cls.settings_for(config).xml_url
     
     @classmethod
-    def get_timeout(cls, config=None):
-        """Get the request timeout from config."""
-        if config is None:
-            config = cls.load()
-        return config["server"]["timeout"]
+    def is_server_configured(cls, config=None):
+        """Return True if the XML URL template has been filled in."""
+        xml_url = cls.get_xml_url(config)
+        return bool(xml_url) and xml_url.strip() != "" and "{add server url}" not in xml_url.lower()
     
     @classmethod
-    def get_verify_ssl(cls, config=None):
-        """Get SSL verification setting from config."""
-        if config is None:
-            config = cls.load()
-        return config["server"]["verify_ssl"]
+    def get_cache_settings(cls, config=None):
+        """Get the manifest cache settings from config, filling in defaults."""
+        return cls.settings_for(config).section("cache")
     
     @classmethod
-    def get_chunk_size(cls, config=None):
-        """Get download chunk size from config."""
-        if config is None:
-            config = cls.load()
-        return config["download"]["chunk_size"]
-    
+    def get_log_settings(cls, config=None):
+        """Get the log panel and log file settings from config, filling in defaults."""
+        return cls.settings_for(config).section("log")
+
     @classmethod
-    def get_output_directory(cls, config=None):
-        """Get output directory from config."""
-        if config is None:
-            config = cls.load()
-        return config["download"]["output_directory"]
+    def get_metrics_settings(cls, config=None):
+        """Get the timing report, metrics endpoint and profiling settings from config."""
+        return cls.settings_for(config).section("metrics")
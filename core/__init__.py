@@ -0,0 +1,11 @@
+import importlib
+
+__all__ = ['http_client', 'package', 'serials', 'manifest', 'manifest_cache', 'catalog', 'fetcher', 'journal', 'library', 'logbuffer', 'metrics', 'progress', 'ratelimit', 'retry', 'chunktuner', 'writer', 'downloader', 'scheduler', 'audit', 'batch']
+
+
+def __getattr__(name):
+    # Submodules are imported on first use so light helpers such as
+    # core.progress do not pull in requests or xml.etree
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,165 @@
+import hashlib
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Bytes hashed per update; large enough that hashlib runs without the GIL
+HASH_BLOCK = 8 * 1024 * 1024
+
+
+def hash_file(path):
+    """Return ``(path, sha1 hex digest)`` of a file read through mmap.
+
+    Runs in a worker process; failures are returned as ``(path, None)`` so a
+    single unreadable file does not stop the audit.
+    """
+    h = hashlib.sha1()
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    if hasattr(mmap, "MADV_SEQUENTIAL"):
+                        m.madvise(mmap.MADV_SEQUENTIAL)
+                    with memoryview(m) as view:
+                        for start in range(0, size, HASH_BLOCK):
+                            h.update(view[start:start + HASH_BLOCK])
+    except (OSError, ValueError):
+        return path, None
+    return path, h.hexdigest()
+
+
+class AuditReport:
+    """Outcome of a library audit, as lists of packages and file names."""
+
+    def __init__(self):
+        self.ok = []         # packages whose file matches size and checksum
+        self.missing = []    # packages of a serial on disk whose file is absent
+        self.truncated = []  # packages whose file is shorter than listed
+        self.corrupt = []    # packages whose file has the wrong size or checksum
+        self.orphaned = []   # .pkg file names no catalogued package explains
+        self.unreadable = []  # packages whose file could not be read
+        self.hashed = 0      # files hashed in this audit
+        self.reused = 0      # files whose hash was reused (incremental)
+
+    @property
+    def problems(self):
+        """Packages worth downloading again."""
+        return self.missing + self.truncated + self.corrupt
+
+    def summary(self):
+        return (
+            f"{len(self.ok)} ok, {len(self.missing)} missing, "
+            f"{len(self.truncated)} truncated, {len(self.corrupt)} corrupt, "
+            f"{len(self.orphaned)} orphaned, {len(self.unreadable)} unreadable "
+            f"({self.hashed} hashed, {self.reused} unchanged)"
+        )
+
+
+class LibraryAudit:
+    """Checks the files in the output directory against known packages.
+
+    Files are matched to packages by the name the downloader saves them
+    under. A file shorter than its package is truncated, one with another
+    size or checksum is corrupt, and a ``.pkg`` file that matches no
+    package is orphaned. A package is missing when its file is absent but
+    another package of the same serial is on disk, so the packages of
+    serials that were never downloaded are not reported.
+
+    Checksums are computed in a pool of worker processes reading the files
+    through mmap. In incremental mode the hash kept by the LibraryIndex is
+    reused for files whose size and mtime have not changed, and new hashes
+    are stored there for the next audit and for the downloader.
+    """
+
+    def __init__(self, directory, library, workers=None, log=None):
+        self.directory = directory
+        self.library = library
+        if not workers:
+            # CPUs this process may run on, which can be fewer than the machine has
+            workers = (len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity")
+                       else os.cpu_count())
+        self.workers = max(1, workers or 1)
+        self.log = log or (lambda msg: None)
+
+    @staticmethod
+    def file_name(pkg):
+        # Same name PackageDownloader.target_path saves the package under
+        return pkg.url.split("/")[-1]
+
+    def run(self, packages, incremental=True, on_progress=None):
+        """Audit the directory against ``packages`` and return an AuditReport.
+
+        ``on_progress(done, total)`` is called with the bytes hashed so far.
+        """
+        report = AuditReport()
+        self.library.refresh()
+        files = dict(self.library.files)
+
+        expected = {}
+        for pkg in packages:
+            expected.setdefault(self.file_name(pkg), pkg)
+        present_serials = {
+            expected[name].serial for name in files if name in expected
+        }
+
+        to_hash = []
+        for name, pkg in expected.items():
+            entry = files.get(name)
+            if entry is None:
+                if pkg.serial in present_serials:
+                    report.missing.append(pkg)
+            elif pkg.size and entry["size"] < pkg.size:
+                report.truncated.append(pkg)
+            elif pkg.size and entry["size"] != pkg.size:
+                report.corrupt.append(pkg)
+            elif not pkg.sha1:
+                report.ok.append(pkg)
+            elif incremental and entry.get("sha1"):
+                report.reused += 1
+                self._judge(report, pkg, entry["sha1"])
+            else:
+                to_hash.append((name, pkg, entry["size"]))
+        report.orphaned = sorted(name for name in files if name not in expected)
+
+        self._hash_all(report, to_hash, on_progress)
+        self.library.save()
+        return report
+
+    def _judge(self, report, pkg, digest):
+        if digest is None:
+            report.unreadable.append(pkg)
+        elif digest == pkg.sha1.lower():
+            report.ok.append(pkg)
+        else:
+            report.corrupt.append(pkg)
+
+    def _hash_all(self, report, to_hash, on_progress):
+        if not to_hash:
+            return
+        # Biggest first so one huge file does not finish last on its own
+        to_hash.sort(key=lambda item: item[2], reverse=True)
+        jobs = {os.path.join(self.directory, name): (name, pkg, size)
+                for name, pkg, size in to_hash}
+        total = sum(size for _, _, size in to_hash)
+        done = 0
+        self.log(f"Hashing {len(jobs)} file(s), {total / 1024 / 1024:.0f} MB "
+                 f"with {min(self.workers, len(jobs))} process(es)")
+
+        # Fresh interpreters: forking a process that runs Qt and network
+        # threads is not safe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs)),
+                                 mp_context=context) as pool:
+            futures = [pool.submit(hash_file, path) for path in jobs]
+            for future in as_completed(futures):
+                path, digest = future.result()
+                name, pkg, size = jobs[path]
+                report.hashed += 1
+                if digest is not None:
+                    self.library.record(name, sha1=digest)
+                self._judge(report, pkg, digest)
+                done += size
+                if on_progress is not None:
+                    on_progress(done, total)
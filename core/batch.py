@@ -0,0 +1,372 @@
+import os
+import time
+
+from config import Config
+
+from .downloader import PackageDownloader
+from .fetcher import ManifestFetcher
+from .audit import LibraryAudit
+from .catalog import Catalog
+from .chunktuner import ChunkTuner
+from .http_client import HttpClient
+from .library import LibraryIndex
+from .logbuffer import configure_file_log
+from .manifest_cache import ManifestCache
+from .metrics import Metrics, MetricsServer, Profiler
+from .package import unique_packages
+from .progress import TransferProgress
+from .ratelimit import BandwidthLimiter
+from .retry import CircuitBreaker, RetryPolicy, describe_error
+from .scheduler import DownloadScheduler
+
+SERVER_NOT_CONFIGURED = (
+    "Server URL is not configured.\n\n"
+    "Please:\n"
+    "1. Click the ⚙ Settings button\n"
+    "2. Enter the server URL in the 'XML URL Template' field\n"
+    "3. Save the settings\n\n"
+    "The URL should be in format: https://example.com/path/{s}-ver.xml\n"
+    "(where {s} is the serial number placeholder)"
+)
+
+CATALOG_DISABLED = "The catalog is disabled (cache.catalog is empty)."
+
+
+# Read sizes learned per host in automatic chunk size mode
+CHUNK_SIZES_FILE = "chunk_sizes.json"
+
+
+def configure_logging(settings):
+    """Apply the log file settings."""
+    configure_file_log(
+        settings.log_file,
+        max_bytes=settings.log_file_max_mb * 1024 * 1024,
+        backup_count=settings.log_file_backups
+    )
+
+
+def build_retry(settings):
+    """Create a RetryPolicy with a fresh per-host circuit breaker."""
+    breaker = CircuitBreaker(settings.breaker_threshold, settings.breaker_cooldown)
+    return RetryPolicy(settings.retries, breaker)
+
+
+def open_catalog(settings, log=None):
+    """Open the package catalog, or return None if it is disabled."""
+    if not settings.catalog_file:
+        return None
+    return Catalog(os.path.join(settings.cache_directory, settings.catalog_file), log=log)
+
+
+def serve_metrics(settings, log=None):
+    """Return new Metrics for one batch that also feed the shared Metrics.
+
+    The shared Metrics, which add up every batch, are served on the
+    configured port if any.
+    """
+    shared = Metrics.shared()
+    try:
+        MetricsServer.serve(shared, settings.metrics_port)
+    except OSError as e:
+        (log or print)(f"Error starting metrics endpoint on port {settings.metrics_port}: {e}")
+    return Metrics(parent=shared)
+
+
+def build_profiler(settings):
+    """Create a Profiler if profiling is enabled, else return None."""
+    return Profiler() if settings.metrics_profile else None
+
+
+def _report_path(settings, name):
+    """Return where the timing report of a ``name`` batch is written."""
+    root, ext = os.path.splitext(settings.metrics_report)
+    return f"{root}-{name}{ext}"
+
+
+def save_metrics(settings, name, metrics=None, profiler=None, log=None):
+    """Write the batch's timing report and profile, if they are enabled.
+
+    Each kind of batch has its own report file, so a download does not
+    overwrite the report of the fetch before it.
+    """
+    log = log or (lambda msg: None)
+    if settings.metrics_report and metrics is not None:
+        path = _report_path(settings, name)
+        try:
+            metrics.write_report(path)
+        except OSError as e:
+            log(f"Error writing timing report: {e}")
+        else:
+            log(f"Timing report written to {path}")
+    if profiler is not None:
+        path = os.path.join(settings.metrics_profile,
+                            f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+        try:
+            os.makedirs(settings.metrics_profile, exist_ok=True)
+            if profiler.save(path):
+                log(f"Profile written to {path}")
+        except OSError as e:
+            log(f"Error writing profile: {e}")
+
+
+def build_fetcher(settings, log=None, profiler=None, verbose=True):
+    """Create a ManifestFetcher from the settings, raising if no server is set.
+
+    The caller closes ``fetcher.catalog`` when it is done.
+    """
+    if not Config.is_server_configured(settings):
+        raise RuntimeError(SERVER_NOT_CONFIGURED)
+
+    cache = None
+    if settings.cache_enabled:
+        cache = ManifestCache(
+            settings.cache_directory,
+            ttl=settings.cache_ttl,
+            negative_ttl=settings.cache_negative_ttl,
+            max_size=settings.cache_max_size_mb * 1024 * 1024
+        )
+
+    return ManifestFetcher(
+        settings.xml_url,
+        timeout=settings.timeout,
+        verify_ssl=settings.verify_ssl,
+        max_workers=settings.max_workers,
+        max_per_host=settings.max_per_host,
+        session=HttpClient.session(settings.pool_size),
+        cache=cache,
+        retry=build_retry(settings),
+        catalog=open_catalog(settings, log),
+        metrics=serve_metrics(settings, log),
+        profiler=profiler,
+        log=log,
+        verbose=verbose
+    )
+
+
+def fetch_packages(serials, settings, log=None):
+    """Fetch the packages of every serial, raising if none were found."""
+    profiler = build_profiler(settings)
+    fetcher = build_fetcher(settings, log=log, profiler=profiler)
+    try:
+        all_packages = fetcher.fetch_all(serials)
+    finally:
+        if fetcher.catalog is not None:
+            fetcher.catalog.close()
+        save_metrics(settings, "fetch", fetcher.metrics, profiler, log)
+    _log_failures(fetcher.failures, log)
+    if not all_packages:
+        if fetcher.failures:
+            raise RuntimeError(
+                f"No PKG found; {len(fetcher.failures)} serial(s) could not be fetched."
+            )
+        raise RuntimeError("No PKG found for any serial.")
+    return all_packages
+
+
+def stream_packages(serials, settings, log=None, on_batch=None, batch_size=500, interval=0.25):
+    """Fetch a possibly huge stream of serials, delivering packages as they arrive.
+
+    Serials are taken from the iterable lazily and packages arrive while
+    their manifest is still being parsed. Packages whose URL was not seen
+    before are passed to ``on_batch(packages)`` in the order they arrive,
+    in lists of up to ``batch_size`` and at least every ``interval``
+    seconds while results come in, so they can be used before the run
+    completes.
+    Returns the number of packages delivered, raising like fetch_packages
+    if there were none.
+    """
+    log = log or (lambda msg: None)
+    on_batch = on_batch or (lambda packages: None)
+    profiler = build_profiler(settings)
+    fetcher = build_fetcher(settings, log=log, profiler=profiler)
+    seen = set()
+    pending = []
+    fetched = delivered = duplicates = 0
+    flushed_at = None
+    try:
+        for _, packages, done in fetcher.fetch_stream(serials):
+            fetched += done
+            for pkg in packages:
+                if pkg.url in seen:
+                    duplicates += 1
+                else:
+                    seen.add(pkg.url)
+                    pending.append(pkg)
+            now = time.monotonic()
+            if pending and (flushed_at is None or len(pending) >= batch_size
+                            or now - flushed_at >= interval):
+                delivered += len(pending)
+                on_batch(pending)
+                pending = []
+                flushed_at = now
+        if pending:
+            delivered += len(pending)
+            on_batch(pending)
+    finally:
+        if fetcher.catalog is not None:
+            fetcher.catalog.close()
+        save_metrics(settings, "fetch", fetcher.metrics, profiler, log)
+
+    if duplicates:
+        log(f"Skipped {duplicates} duplicate package(s)")
+    _log_failures(fetcher.failures, log)
+    if not fetched:
+        raise RuntimeError("No serials given.")
+    if not delivered:
+        if fetcher.failures:
+            raise RuntimeError(
+                f"No PKG found; {len(fetcher.failures)} serial(s) could not be fetched."
+            )
+        raise RuntimeError("No PKG found for any serial.")
+    return delivered
+
+
+def _log_failures(failures, log, limit=ManifestFetcher.FAILURE_LOG_LIMIT):
+    if failures and log:
+        failed = list(failures)
+        more = f" and {len(failed) - limit} more" if len(failed) > limit else ""
+        log(f"{len(failed)} serial(s) could not be fetched: {', '.join(failed[:limit])}{more}")
+
+
+def scan_serials(serials, settings, log=None, report_every=100):
+    """Fetch a possibly huge stream of serials into the catalog only.
+
+    Nothing is kept in memory besides the serials in flight; progress is
+    logged every ``report_every`` serials. Returns ``(scanned, found,
+    packages)``.
+    """
+    log = log or (lambda msg: None)
+    if not settings.catalog_file:
+        raise RuntimeError(CATALOG_DISABLED)
+
+    # Per-serial lines would drown the progress of a long scan
+    profiler = build_profiler(settings)
+    fetcher = build_fetcher(settings, log=log, profiler=profiler, verbose=False)
+    scanned = found = packages = 0
+    try:
+        for serial, result in fetcher.fetch_iter(serials):
+            scanned += 1
+            if result:
+                found += 1
+                packages += len(result)
+            if scanned % report_every == 0:
+                log(f"Scanned {scanned} serial(s), {found} with packages ({packages} package(s))")
+    finally:
+        fetcher.catalog.close()
+        save_metrics(settings, "scan", fetcher.metrics, profiler, log)
+
+    log(f"Scan finished: {scanned} serial(s), {found} with packages ({packages} package(s))")
+    _log_failures(fetcher.failures, log)
+    return scanned, found, packages
+
+
+def search_catalog(text, settings, limit=Catalog.SEARCH_LIMIT):
+    """Search the catalog offline; returns matching packages."""
+    catalog = open_catalog(settings)
+    if catalog is None:
+        raise RuntimeError(CATALOG_DISABLED)
+    try:
+        return catalog.search(text, limit=limit)
+    finally:
+        catalog.close()
+
+
+def audit_library(settings, log=None, incremental=True, on_progress=None):
+    """Check the output directory against the catalog and return an AuditReport.
+
+    ``on_progress(done, total)`` receives the bytes hashed so far.
+    """
+    log = log or (lambda msg: None)
+    catalog = open_catalog(settings)
+    if catalog is None:
+        raise RuntimeError(CATALOG_DISABLED)
+    try:
+        packages = catalog.all_packages()
+    finally:
+        catalog.close()
+
+    output_dir = settings.output_directory
+    if not os.path.isdir(output_dir):
+        raise RuntimeError(f"Output directory not found: {output_dir}")
+
+    audit = LibraryAudit(output_dir, LibraryIndex(output_dir), log=log)
+    report = audit.run(packages, incremental=incremental, on_progress=on_progress)
+    for label, items in (("Missing", report.missing), ("Truncated", report.truncated),
+                         ("Corrupt", report.corrupt), ("Unreadable", report.unreadable)):
+        for pkg in items:
+            log(f"✗ {label}: {LibraryAudit.file_name(pkg)} ({pkg.serial} {pkg.title} {pkg.version})")
+    for name in report.orphaned:
+        log(f"? Orphaned: {name}")
+    log(f"Audit: {report.summary()}")
+    return report
+
+
+def download_packages(packages, settings, log=None, on_progress=None, on_failure=None):
+    """Download packages into the configured output directory.
+
+    Returns the total number of bytes downloaded. ``on_progress`` receives
+    rate-limited TransferProgress snapshots. Packages sharing a URL are
+    downloaded once. Bandwidth is capped by the shared BandwidthLimiter,
+    whose limits are reset from the settings here. A package that fails is
+    logged and passed to ``on_failure(pkg, reason)``; the others carry on.
+    Phase timings go to the batch's timing report and the shared Metrics.
+    """
+    log = log or (lambda msg: None)
+    packages = list(unique_packages(packages))
+    limiter = BandwidthLimiter.shared()
+    limiter.set_limits(settings.rate_limit, settings.host_rate_limits)
+    output_dir = settings.output_directory
+    os.makedirs(output_dir, exist_ok=True)
+    library = LibraryIndex(output_dir) if settings.skip_existing else None
+    progress = TransferProgress(packages, callback=on_progress)
+    profiler = build_profiler(settings)
+    tuner = None
+    if not settings.chunk_size:
+        tuner = ChunkTuner(os.path.join(settings.cache_directory, CHUNK_SIZES_FILE))
+
+    downloader = PackageDownloader(
+        output_dir,
+        chunk_size=settings.chunk_size,
+        verify_ssl=settings.verify_ssl,
+        segments=settings.segments,
+        verify_checksum=settings.verify_checksum,
+        session=HttpClient.session(settings.pool_size),
+        library=library,
+        progress=progress,
+        limiter=limiter,
+        preallocate=settings.preallocate,
+        tuner=tuner,
+        timeout=settings.timeout,
+        retry=build_retry(settings),
+        metrics=serve_metrics(settings, log),
+        profiler=profiler,
+        log=log
+    )
+
+    def failed(pkg, exc):
+        reason = describe_error(exc)
+        log(f"✗ Failed: {pkg.title} ({pkg.version}): {reason}")
+        if on_failure is not None:
+            on_failure(pkg, reason)
+
+    scheduler = DownloadScheduler(
+        profiler.wrap(downloader.download) if profiler is not None else downloader.download,
+        max_concurrent=settings.concurrent_downloads,
+        order=settings.queue_order,
+        limiter=limiter,
+        on_failure=failed,
+        on_cancel=downloader.cancel
+    )
+    try:
+        downloaded_size = scheduler.run(packages)
+        if scheduler.failures:
+            log(f"{len(scheduler.failures)} of {len(packages)} package(s) failed")
+        return downloaded_size
+    finally:
+        progress.flush()
+        limiter.clear_priorities(pkg.url for pkg in packages)
+        if library is not None:
+            library.save()
+        if tuner is not None:
+            tuner.save()
+        save_metrics(settings, "download", downloader.metrics, profiler, log)
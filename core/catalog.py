@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import threading
+import time
+
+from .package import Package
+
+
+class Catalog:
+    """Local SQLite catalog of the packages listed in fetched manifests.
+
+    Every fetched serial replaces its rows, so the catalog always holds the
+    last known manifest of each serial together with when it was fetched;
+    serials without a manifest are remembered with no packages. Searches
+    run entirely offline. One connection is shared by the fetch threads
+    behind a lock, and WAL mode lets another Catalog (e.g. the window's
+    search) read while a scan is writing. Errors while saving are passed to
+    ``log``.
+    """
+
+    SCHEMA_VERSION = 2
+    SEARCH_LIMIT = 5000
+
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS packages (
+            serial TEXT NOT NULL,
+            tag TEXT,
+            title TEXT COLLATE NOCASE,
+            version TEXT,
+            size INTEGER NOT NULL,
+            url TEXT NOT NULL,
+            sha1 TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (serial, url)
+        )""",
+        "CREATE INDEX IF NOT EXISTS packages_title ON packages (title)",
+        "CREATE INDEX IF NOT EXISTS packages_version ON packages (version)",
+        """CREATE TABLE IF NOT EXISTS serials (
+            serial TEXT PRIMARY KEY,
+            packages INTEGER NOT NULL,
+            fetched_at REAL NOT NULL
+        )""",
+    )
+
+    COLUMNS = "title, tag, version, size, url, sha1, serial"
+
+    def __init__(self, path, log=None):
+        self.path = path
+        self.log = log or print
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._lock:
+            self._setup()
+
+    def _setup(self):
+        db = self._db
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        if db.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+            # Only fetched data lives here, so an old layout is simply rebuilt
+            db.execute("DROP TABLE IF EXISTS packages")
+            db.execute("DROP TABLE IF EXISTS serials")
+        with db:
+            for statement in self.SCHEMA:
+                db.execute(statement)
+            db.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def record(self, serial, packages, fetched_at=None):
+        """Replace what is known about ``serial`` with a fetched manifest."""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        rows = [
+            (serial, pkg.tag, pkg.title, pkg.version, pkg.size or 0, pkg.url,
+             pkg.sha1 or "", fetched_at)
+            for pkg in packages
+        ]
+        with self._lock:
+            try:
+                with self._db:
+                    self._db.execute("DELETE FROM packages WHERE serial = ?", (serial,))
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO packages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+                    )
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO serials VALUES (?, ?, ?)",
+                        (serial, len(rows), fetched_at)
+                    )
+            except sqlite3.Error as e:
+                self.log(f"Error saving catalog for {serial}: {e}")
+
+    def search(self, text="", limit=SEARCH_LIMIT):
+        """Return packages matching every word of ``text``.
+
+        A word matches a serial by prefix, or a title, tag or version
+        anywhere, case-insensitively.
+        """
+        clauses = []
+        params = []
+        for word in text.split():
+            pattern = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append(
+                "(serial LIKE ? ESCAPE '\\' OR title LIKE ? ESCAPE '\\' "
+                "OR tag LIKE ? ESCAPE '\\' OR version LIKE ? ESCAPE '\\')"
+            )
+            params += [pattern + "%"] + [f"%{pattern}%"] * 3
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = (f"SELECT {self.COLUMNS} FROM packages {where} "
+                 f"ORDER BY serial, tag, version LIMIT ?")
+        with self._lock:
+            rows = self._db.execute(query, params + [limit]).fetchall()
+        return [Package(*row) for row in rows]
+
+    def packages_for(self, serial):
+        """Return the catalogued packages of one serial."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {self.COLUMNS} FROM packages WHERE serial = ? ORDER BY tag, version",
+                (serial,)
+            ).fetchall()
+        return [Package(*row) for row in rows]
+
+    def all_packages(self):
+        """Return every catalogued package, once per URL."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {self.COLUMNS} FROM packages GROUP BY url ORDER BY serial, tag, version"
+            ).fetchall()
+        return [Package(*row) for row in rows]
+
+    def stats(self):
+        """Return ``(serials, serials with packages, packages)`` in the catalog."""
+        with self._lock:
+            serials, found = self._db.execute(
+                "SELECT COUNT(*), COUNT(NULLIF(packages, 0)) FROM serials"
+            ).fetchone()
+            packages = self._db.execute("SELECT COUNT(*) FROM packages").fetchone()[0]
+        return serials, found, packages
@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+
+
+class ChunkTuner:
+    """Learns a read size per host from how long reads take.
+
+    Each stream starts from the size last learned for its host and sizes
+    every read so it takes about ``TARGET`` seconds at the measured rate:
+    large enough to keep per-read overhead low on fast links, small enough
+    to bound buffer memory and keep progress smooth on slow ones. Learned
+    sizes are kept in a small JSON file for the next session.
+    """
+
+    FORMAT = 1
+    MIN_SIZE = 64 * 1024
+    MAX_SIZE = 4 * 1024 * 1024
+    START_SIZE = 256 * 1024
+    TARGET = 0.1  # seconds per read
+
+    def __init__(self, path=None):
+        self.path = path
+        self.sizes = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("format") == self.FORMAT:
+            self.sizes = {
+                host: self.clamp(size) for host, size in data.get("sizes", {}).items()
+                if isinstance(size, int)
+            }
+
+    def save(self):
+        """Write the learned sizes to disk if they changed."""
+        with self._lock:
+            if not self._dirty or not self.path:
+                return
+            data = {"format": self.FORMAT, "sizes": self.sizes}
+            tmp = self.path + ".tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(tmp, "w") as f:
+                    json.dump(data, f)
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except OSError as e:
+                print(f"Error saving chunk sizes: {e}")
+
+    @classmethod
+    def clamp(cls, size):
+        """Round down to a power of two within the allowed range."""
+        chosen = cls.MIN_SIZE
+        while chosen * 2 <= size and chosen < cls.MAX_SIZE:
+            chosen *= 2
+        return chosen
+
+    def stream(self, host):
+        """Return the sizer for one transfer stream to ``host``."""
+        with self._lock:
+            size = self.sizes.get(host, self.START_SIZE)
+        return ChunkSizer(self, host, size)
+
+    def learn(self, host, size):
+        with self._lock:
+            if self.sizes.get(host) != size:
+                self.sizes[host] = size
+                self._dirty = True
+
+
+class ChunkSizer:
+    """Read size of a single stream, updated after every read.
+
+    Reads quicker than ``MIN_TIME`` were served from data already buffered
+    and say nothing about the link, so they leave the size alone, and a
+    stream made mostly of them is not learned from. The size at most
+    doubles per read, so one fast read cannot jump it to ``MAX_SIZE``.
+    """
+
+    __slots__ = ("tuner", "host", "size", "_rate", "_reads", "_hits")
+
+    # Weight of the newest read in the smoothed rate
+    SMOOTHING = 0.3
+
+    # Reads measured before the size is worth remembering
+    MIN_READS = 8
+
+    # Reads faster than this (seconds) count as buffer hits
+    MIN_TIME = 0.001
+
+    def __init__(self, tuner, host, size):
+        self.tuner = tuner
+        self.host = host
+        self.size = size
+        self._rate = None
+        self._reads = 0
+        self._hits = 0
+
+    def record(self, nbytes, seconds):
+        """Account for a read of ``nbytes`` that took ``seconds``."""
+        if seconds < self.MIN_TIME:
+            self._hits += 1
+            return
+        rate = nbytes / seconds
+        if self._rate is None:
+            self._rate = rate
+        else:
+            self._rate += (rate - self._rate) * self.SMOOTHING
+        self._reads += 1
+        self.size = min(self.tuner.clamp(self._rate * self.tuner.TARGET), self.size * 2)
+
+    def finish(self):
+        """Remember the settled size for the host once enough reads were measured."""
+        if self._reads >= self.MIN_READS and self._reads >= self._hits:
+            self.tuner.learn(self.host, self.size)
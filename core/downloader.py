@@ -0,0 +1,554 @@
+import hashlib
+import http.client
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import urllib3
+
+from .chunktuner import ChunkTuner
+from .http_client import HttpClient
+from .journal import TransferJournal
+from .metrics import RequestTiming
+from .retry import RetryPolicy, describe_error
+from .writer import BufferPool, ChunkWriter
+
+
+class IncompleteDownload(ConnectionError):
+    """The connection ended before the whole file had arrived."""
+
+
+class PrefixHasher:
+    """SHA-1 of a part file, computed in file order while its segments are written.
+
+    Bytes written at the first offset not hashed yet are hashed straight
+    from the write buffer. Bytes a later segment wrote further ahead are
+    read back from the file as soon as everything before them is hashed,
+    while the transfer goes on. A single stream is thus hashed without
+    reading the file; a segmented one only re-reads what later segments
+    wrote before the earlier ones finished, usually from the page cache,
+    rather than the whole file after the transfer.
+    """
+
+    READ_SIZE = 1024 * 1024
+
+    def __init__(self, path, journal):
+        self.path = path
+        self._sha1 = hashlib.sha1()
+        self._ranges = [(start, end) for start, end, _ in journal.segments]
+        # End of the bytes written so far, per segment
+        self._written = [start + committed for start, end, committed in journal.segments]
+        self._offset = 0
+        self._busy = False  # a thread is feeding the hasher
+        self._file = None
+        self._lock = threading.Lock()
+
+    def written(self, index, position, view):
+        """Account for ``view`` having been written at ``position`` by segment ``index``."""
+        with self._lock:
+            self._written[index] = position + len(view)
+            if self._busy or position != self._offset:
+                return
+            self._busy = True
+        try:
+            self._sha1.update(view)
+            with self._lock:
+                self._offset = position + len(view)
+        except BaseException:
+            with self._lock:
+                self._busy = False
+            raise
+        self._drain()
+
+    def catch_up(self):
+        """Hash the bytes already on disk after the hashed prefix, e.g. of a resumed transfer."""
+        with self._lock:
+            if self._busy:
+                return
+            self._busy = True
+        self._drain()
+
+    def reset(self, index):
+        """Start over after segment ``index`` restarted from its first byte."""
+        with self._lock:
+            self._sha1 = hashlib.sha1()
+            self._offset = 0
+            self._written[index] = self._ranges[index][0]
+
+    def hexdigest(self):
+        """Return the digest, or None if some written bytes could not be hashed."""
+        self.catch_up()
+        self.close()
+        start, end = self._ranges[-1]
+        size = self._written[-1] if end is None else end + 1
+        return self._sha1.hexdigest() if self._offset == size else None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _available(self):
+        """End of the contiguous written bytes at the hashed offset (lock held)."""
+        for (start, end), written in zip(self._ranges, self._written):
+            if start <= self._offset and (end is None or self._offset <= end):
+                return written
+        return self._offset
+
+    def _drain(self):
+        # Called by the thread that set _busy; reads outside the lock so
+        # writers are only held up for the bookkeeping
+        try:
+            while True:
+                with self._lock:
+                    offset = self._offset
+                    length = min(self._available() - offset, self.READ_SIZE)
+                    if length <= 0:
+                        self._busy = False
+                        return
+                if self._file is None:
+                    self._file = open(self.path, "rb")
+                self._file.seek(offset)
+                block = self._file.read(length)
+                if not block:
+                    with self._lock:
+                        self._busy = False
+                    return
+                self._sha1.update(block)
+                with self._lock:
+                    self._offset = offset + len(block)
+        except BaseException:
+            with self._lock:
+                self._busy = False
+            raise
+
+
+class PackageDownloader:
+    """Downloads a single package into the output directory.
+
+    Packages with a manifest ``sha1sum`` are hashed by a PrefixHasher while
+    the bytes are written and retried once on a mismatch.
+
+    Data is written to ``<name>.part`` next to a ``<name>.part.json``
+    journal and renamed into place once complete, so an interrupted transfer
+    resumes with HTTP Range requests instead of starting over. Large files
+    are split into byte ranges fetched over several connections when the
+    server advertises ``Accept-Ranges: bytes``. Every chunk received passes
+    through the optional bandwidth ``limiter``.
+
+    The body is read into a pool of reusable buffers and written by a
+    separate ChunkWriter thread, so a slow disk does not stall the network
+    read. With ``preallocate`` the file's full size is reserved on disk
+    before the first byte arrives.
+
+    ``chunk_size`` is a fixed read size; 0 sizes reads automatically with a
+    ChunkTuner, which can be passed in to share learned sizes.
+
+    Timeouts, dropped connections and server errors are retried by
+    ``retry``; each retry resumes from the bytes already journalled. After
+    ``cancel`` every download stops at its next read with CancelledError,
+    leaving its part file and journal to resume from.
+
+    The phase timings of every download are recorded in the optional
+    ``metrics``, and the segment threads of a transfer run under the
+    optional ``profiler``.
+    """
+
+    MIN_SEGMENT_SIZE = 8 * 1024 * 1024  # 8 MB
+    PART_SUFFIX = ".part"
+    JOURNAL_SUFFIX = ".part.json"
+    HASH_CHUNK = 1024 * 1024
+    LIMITED_CHUNK = 64 * 1024  # read size while a bandwidth limit is set
+    BUFFERS = 16  # read buffers shared by all transfers of this downloader
+
+    def __init__(self, output_dir, chunk_size=1048576, verify_ssl=False,
+                 segments=1, verify_checksum=True, session=None, library=None,
+                 progress=None, limiter=None, preallocate=False, tuner=None,
+                 timeout=None, retry=None, metrics=None, profiler=None, log=None):
+        self.output_dir = output_dir
+        self.chunk_size = chunk_size
+        self.verify_ssl = verify_ssl
+        self.segments = max(1, segments)
+        self.verify_checksum = verify_checksum
+        self.session = session or HttpClient.session()
+        self.library = library
+        self.limiter = limiter
+        self.preallocate = preallocate
+        self.tuner = tuner if tuner is not None or chunk_size else ChunkTuner()
+        self.buffers = BufferPool(self.BUFFERS)
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.metrics = metrics
+        self.profiler = profiler
+        self.progress = progress
+        self.log = log or (lambda msg: None)
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Make running and later downloads stop with CancelledError."""
+        self._cancelled.set()
+
+    def _check_cancelled(self):
+        if self._cancelled.is_set():
+            raise CancelledError()
+
+    def target_path(self, pkg):
+        """Return the local file path a package is saved to."""
+        return os.path.join(self.output_dir, pkg.url.split("/")[-1])
+
+    def download(self, pkg):
+        """Download a package and return the number of bytes saved.
+
+        Returns 0 when an identical file is already present and None when the
+        file could not be found on disk afterwards.
+        """
+        filename = self.target_path(pkg)
+        name = os.path.basename(filename)
+        expected = (pkg.sha1 or "").lower() if self.verify_checksum else ""
+        if self.library is not None and self.library.has(name, pkg.size, expected):
+            self.log(f"✓ Already present: {filename}")
+            if self.progress is not None:
+                self.progress.complete(pkg.url)
+            return 0
+
+        # Don't wait on a host the breaker has already given up on
+        self.retry.check(pkg.url)
+        self.log(f"Downloading {pkg.title} ({pkg.version})")
+        part = filename + self.PART_SUFFIX
+        timing = RequestTiming("download", pkg.url, name)
+
+        def retrying(exc, attempt, delay):
+            timing.retries += 1
+            self.log(f"  {name}: {describe_error(exc)}, retry {attempt}/{self.retry.retries} "
+                     f"in {delay:.1f}s")
+
+        def fetch(journal):
+            self._check_cancelled()
+            hasher = self._fetch_segments(pkg.url, part, journal, timing, bool(expected))
+            size = pkg.size or 0
+            if size and journal.committed != size:
+                # Retried like a dropped connection, resuming where it stopped
+                raise IncompleteDownload(
+                    f"Incomplete download for {pkg.url}: "
+                    f"got {journal.committed} of {size} bytes"
+                )
+            return hasher
+
+        try:
+            with timing.active():
+                for attempt in range(2):
+                    journal = self._open_journal(pkg, filename, part)
+                    hasher = self.retry.call(pkg.url, lambda: fetch(journal), on_retry=retrying)
+
+                    digest = None
+                    if expected:
+                        # Falls back to a full read if the hasher missed any bytes
+                        digest = (hasher.hexdigest() if hasher else None) or self._hash_file(part)
+                        if digest != expected:
+                            os.remove(part)
+                            journal.remove()
+                            if attempt == 0:
+                                self.log(f"✗ Checksum mismatch for {name}, retrying")
+                                continue
+                            raise RuntimeError(f"Checksum mismatch for {name}")
+                    break
+        except Exception as e:
+            self._finish(timing, e)
+            raise
+        self._finish(timing)
+
+        os.replace(part, filename)
+        journal.remove()
+        if self.library is not None:
+            self.library.record(name, sha1=digest)
+        if self.progress is not None:
+            self.progress.complete(pkg.url)
+
+        # Verify file was written
+        if os.path.exists(filename):
+            file_size = os.path.getsize(filename)
+            self.log(f"✓ Saved: {filename} ({file_size / 1024 / 1024:.2f} MB)")
+            return file_size
+
+        self.log(f"✗ Failed to save: {filename}")
+        return None
+
+    def _finish(self, timing, exc=None):
+        if self.metrics is not None:
+            timing.finish(describe_error(exc) if exc is not None else None)
+            self.metrics.record(timing)
+
+    def _open_journal(self, pkg, filename, part):
+        """Resume a matching interrupted transfer or start a new one."""
+        url = pkg.url
+        size = pkg.size or 0
+        journal_path = filename + self.JOURNAL_SUFFIX
+
+        journal = None
+        if os.path.exists(part):
+            journal = TransferJournal.load(journal_path, url, size)
+            if journal is not None and journal.committed:
+                self.log(
+                    f"  Resuming at {journal.committed / 1024 / 1024:.2f} MB"
+                )
+            else:
+                journal = None
+
+        if journal is None:
+            ranges = self._plan_segments(pkg) or [(0, size - 1 if size else None)]
+            with open(part, "wb") as f:
+                if size and (len(ranges) > 1 or self.preallocate):
+                    # Size the file up front so every segment can write at its own offset
+                    self._allocate(f, size)
+            journal = TransferJournal.create(journal_path, url, size, ranges)
+
+        if self.progress is not None:
+            self.progress.begin(url, size, journal.committed)
+        return journal
+
+    def _plan_segments(self, pkg):
+        """Return the (start, end) byte ranges to fetch, or None for a single stream."""
+        size = pkg.size or 0
+        count = min(self.segments, size // self.MIN_SEGMENT_SIZE)
+        if count < 2 or not self._supports_ranges(pkg.url, size):
+            return None
+
+        step = size // count
+        ranges = []
+        for i in range(count):
+            start = i * step
+            end = size - 1 if i == count - 1 else start + step - 1
+            ranges.append((start, end))
+        return ranges
+
+    def _supports_ranges(self, url, size):
+        """Check that the server accepts byte ranges and agrees on the file size."""
+        try:
+            r = self.session.head(url, allow_redirects=True, verify=self.verify_ssl,
+                                  timeout=self.timeout)
+            r.raise_for_status()
+        except Exception:
+            return False
+
+        if r.headers.get("Accept-Ranges", "").lower() != "bytes":
+            return False
+        length = r.headers.get("Content-Length")
+        return length is None or int(length) == size
+
+    def _fetch_segments(self, url, part, journal, timing, hashing=False):
+        """Fetch every unfinished segment.
+
+        Returns the PrefixHasher of the transfer when ``hashing`` is set,
+        otherwise None.
+        """
+        count = len(journal.segments)
+        hasher = None
+        if hashing:
+            hasher = PrefixHasher(part, journal)
+            # Resumed bytes are hashed once, before new ones arrive
+            hasher.catch_up()
+        try:
+            if count == 1:
+                self._fetch_segment(url, part, journal, 0, timing, hasher)
+                return hasher
+
+            def fetch_segment(index):
+                with timing.active():
+                    self._fetch_segment(url, part, journal, index, timing, hasher)
+
+            if self.profiler is not None:
+                fetch_segment = self.profiler.wrap(fetch_segment)
+            with ThreadPoolExecutor(max_workers=count) as pool:
+                futures = [pool.submit(fetch_segment, index) for index in range(count)]
+                for future in futures:
+                    future.result()
+            return hasher
+        except BaseException:
+            if hasher is not None:
+                hasher.close()
+            raise
+        finally:
+            journal.save()
+
+    def _fetch_segment(self, url, part, journal, index, timing, hasher=None):
+        offset, end = journal.position(index)
+        if end is not None and offset > end:
+            return
+
+        headers = {}
+        if offset or len(journal.segments) > 1:
+            headers["Range"] = f"bytes={offset}-{'' if end is None else end}"
+
+        with timing.first_byte():
+            r = self.session.get(url, headers=headers, stream=True, verify=self.verify_ssl,
+                                 timeout=self.timeout)
+        with r:
+            timing.status = r.status_code
+            r.raise_for_status()
+            if headers and r.status_code != 206:
+                if len(journal.segments) > 1:
+                    raise RuntimeError(f"Server ignored range request for {url}")
+                # Server restarted the transfer from the first byte
+                self.log("  Server does not support resume, restarting")
+                journal.reset(index)
+                offset = 0
+                if hasher is not None:
+                    hasher.reset(index)
+                if self.progress is not None:
+                    self.progress.begin(url, journal.size, 0)
+
+            limiter = self.limiter
+            host = urlsplit(url).netloc
+            sizer = None
+            chunk_size = self.chunk_size
+            if limiter is not None and limiter.active:
+                # Smaller reads keep a throttled transfer smooth
+                chunk_size = min(chunk_size or self.LIMITED_CHUNK, self.LIMITED_CHUNK)
+            elif not chunk_size:
+                sizer = self.tuner.stream(host)
+                chunk_size = sizer.size
+
+            with open(part, "r+b", buffering=0) as f:
+                f.seek(offset)
+                if offset == 0 and not journal.size:
+                    f.truncate()
+                position = offset
+
+                def written(view):
+                    nonlocal position
+                    if hasher is not None:
+                        hasher.written(index, position, view)
+                    position += len(view)
+                    journal.advance(index, len(view))
+                    if self.progress is not None:
+                        self.progress.add(url, len(view))
+
+                writer = ChunkWriter(f, self.buffers, written)
+                writer.start()
+                throttled = 0.0
+                try:
+                    for buf, length in self._read_chunks(r, chunk_size, sizer, timing):
+                        try:
+                            self._check_cancelled()
+                            if limiter is not None:
+                                started = time.perf_counter()
+                                limiter.acquire(url, host, length)
+                                throttled += time.perf_counter() - started
+                            writer.write(buf, length)
+                        except BaseException:
+                            self.buffers.put(buf)
+                            raise
+                finally:
+                    writer.close()
+                    timing.add("throttle", throttled)
+                    timing.add("disk", writer.write_time)
+                writer.check()
+            if sizer is not None:
+                sizer.finish()
+
+        # A body without a Content-Length can end early without an error
+        offset, end = journal.position(index)
+        if end is not None and offset <= end:
+            raise IncompleteDownload(
+                f"Incomplete segment for {url}: stopped at byte {offset} of {end + 1}"
+            )
+
+    def _read_chunks(self, r, size, sizer=None, timing=None):
+        """Yield ``(buffer, length)`` pairs read from a streamed response.
+
+        Uncompressed bodies are read into pooled buffers with ``readinto``,
+        each read sized and timed by ``sizer`` when given; anything else
+        falls back to ``iter_content`` and is copied into a pooled buffer.
+        Time spent reading is charged to ``timing``.
+        """
+        raw, direct = self._raw_stream(r)
+        if raw is None:
+            chunks = r.iter_content(chunk_size=size)
+            if timing is not None:
+                chunks = timing.iterate(chunks)
+            for chunk in chunks:
+                if chunk:
+                    buf = self.buffers.get(len(chunk))
+                    buf[:len(chunk)] = chunk
+                    yield buf, len(chunk)
+            return
+
+        spent = 0.0
+        received = 0
+        try:
+            while True:
+                if sizer is not None:
+                    size = sizer.size
+                buf = self.buffers.get(size)
+                try:
+                    started = time.perf_counter()
+                    with memoryview(buf)[:size] as view:
+                        length = raw.readinto(view)
+                except BaseException:
+                    self.buffers.put(buf)
+                    raise
+                elapsed = time.perf_counter() - started
+                spent += elapsed
+                received += length
+                if sizer is not None and length:
+                    sizer.record(length, elapsed)
+                if not length:
+                    self.buffers.put(buf)
+                    break
+                yield buf, length
+            if direct:
+                self._finish_direct(r, raw, received)
+        finally:
+            if timing is not None:
+                timing.add("transfer", spent, received)
+
+    @staticmethod
+    def _raw_stream(r):
+        """Return ``(stream, direct)`` to read an undecoded body from, or ``(None, False)``.
+
+        The stream is the http.client response under urllib3 when it can be
+        reached (``direct``), as its ``readinto`` fills the buffer without
+        allocating. Otherwise it is urllib3's public ``readinto``, which
+        reads into a new bytes object and copies it, with the
+        Content-Length enforced.
+        """
+        if r.headers.get("Content-Encoding", "identity").lower() != "identity":
+            return None, False
+        raw = r.raw
+        fp = getattr(raw, "_fp", None)
+        if isinstance(fp, http.client.HTTPResponse) and hasattr(raw, "release_conn"):
+            return fp, True
+        if hasattr(raw, "readinto") and hasattr(raw, "enforce_content_length"):
+            raw.enforce_content_length = True
+            return raw, False
+        return None, False
+
+    @staticmethod
+    def _finish_direct(r, fp, received):
+        """Do what urllib3 would have done at the end of a body read past it."""
+        expected = r.headers.get("Content-Length", "")
+        if expected.isdigit() and received < int(expected):
+            raise urllib3.exceptions.IncompleteRead(received, int(expected) - received)
+        # http.client closes a response once its whole body is read; anything
+        # else is left to Response.close(), which drops the connection
+        if fp.isclosed():
+            r.raw.release_conn()
+
+    def _allocate(self, f, size):
+        """Grow a new file to ``size`` bytes, reserving the blocks if ``preallocate`` is set."""
+        if self.preallocate and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(f.fileno(), 0, size)
+                return
+            except OSError:
+                pass
+        f.truncate(size)
+
+    def _hash_file(self, path):
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(self.HASH_CHUNK), b""):
+                h.update(block)
+        return h.hexdigest()
@@ -0,0 +1,287 @@
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+from .http_client import HttpClient
+from .manifest import iter_manifest
+from .manifest_cache import ManifestCache
+from .metrics import RequestTiming
+from .package import unique_packages
+from .retry import RetryPolicy, describe_error
+
+
+class ManifestFetcher:
+    """Fetches and parses update manifests for many serials concurrently.
+
+    Manifests are parsed while they download instead of after the whole body
+    has been read into memory. Transient failures are retried by ``retry``;
+    serials that still fail are collected in ``failures`` (serial -> reason)
+    while the rest of the batch goes on; only the first ``FAILURE_LOG_LIMIT``
+    of them are logged one by one. Every manifest fetched from the server is
+    also written to the optional ``catalog``. Without ``verbose`` only
+    failures are logged, not the progress of each serial.
+
+    Each request's phase timings are recorded in the optional ``metrics``,
+    and every fetch runs under the optional ``profiler``.
+    """
+
+    # Bytes read from the response per parser feed
+    READ_SIZE = 64 * 1024
+    # Failed serials logged one by one before the rest are only counted
+    FAILURE_LOG_LIMIT = 20
+
+    def __init__(self, xml_url, timeout=15, verify_ssl=False,
+                 max_workers=8, max_per_host=4, session=None, cache=None,
+                 retry=None, catalog=None, metrics=None, profiler=None, log=None,
+                 verbose=True):
+        self.xml_url = xml_url
+        self.timeout = timeout
+        self.verify_ssl = verify_ssl
+        self.max_workers = max(1, max_workers)
+        self.max_per_host = max(1, max_per_host)
+        self.session = session or HttpClient.session()
+        self.cache = cache
+        self.retry = retry or RetryPolicy()
+        self.catalog = catalog
+        self.metrics = metrics
+        self.profiler = profiler
+        self.failures = {}
+        self.log = log or (lambda msg: None)
+        self.verbose = verbose
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+
+    def _slot_for(self, url):
+        """Return the semaphore limiting in-flight requests to the url's host."""
+        host = urlsplit(url).netloc
+        with self._host_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_per_host)
+                self._host_slots[host] = slot
+            return slot
+
+    def fetch_one(self, serial, on_packages=None):
+        """Fetch and parse the manifest for a single serial.
+
+        Returns an empty list when the manifest is missing or unreadable.
+        ``on_packages(packages)`` is called with the packages parsed from
+        each read of the response body before the next read; a retry does
+        not pass the same packages again. Cached manifests are only
+        returned.
+        """
+        url = self.xml_url.format(s=serial)
+        entry = self.cache.get(url) if self.cache else None
+
+        if entry is not None and self.cache.is_fresh(entry):
+            packages = entry["packages"]
+            if packages is None:
+                self._progress(f"  {serial} file not available (cached)")
+                return []
+            return self._report(serial, packages, " (cached)")
+
+        self._progress(f"Fetching XML for {serial}: {url}")
+        timing = RequestTiming("fetch", url, serial)
+        sent = 0
+
+        def reads(chunks, parsed):
+            # Hand over what the previous read produced before waiting on the next
+            nonlocal sent
+            chunks = iter(chunks)
+            while True:
+                if on_packages is not None and len(parsed) > sent:
+                    on_packages(parsed[sent:])
+                    sent = len(parsed)
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+
+        def request():
+            with self._slot_for(url), timing.active():
+                with timing.first_byte():
+                    r = self.session.get(
+                        url,
+                        headers=ManifestCache.validators(entry),
+                        timeout=self.timeout,
+                        verify=self.verify_ssl,
+                        stream=True
+                    )
+                with r:
+                    timing.status = r.status_code
+                    if r.status_code == 304 and entry is not None:
+                        return r, None
+                    if r.status_code in (404, 410) and self.cache:
+                        self.cache.put_missing(url)
+                    r.raise_for_status()
+                    # Parsing runs between reads: whatever is not waiting on the body
+                    started = time.perf_counter()
+                    received = timing.get("transfer")
+                    chunks = timing.iterate(r.iter_content(self.READ_SIZE))
+                    packages = []
+                    for pkg in iter_manifest(reads(chunks, packages), serial):
+                        packages.append(pkg)
+                    timing.add("parse", time.perf_counter() - started
+                               - (timing.get("transfer") - received))
+                    return r, packages
+
+        def retrying(exc, attempt, delay):
+            timing.retries += 1
+            self._progress(f"  {serial} {describe_error(exc)}, retry {attempt}/{self.retry.retries} "
+                           f"in {delay:.1f}s")
+
+        try:
+            r, packages = self.retry.call(url, request, on_retry=retrying)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code in (404, 410):
+                self._finish(timing)
+                self._progress(f"  {serial} file not available")
+                if self.catalog is not None:
+                    self.catalog.record(serial, [])
+                return []
+            self._finish(timing, e)
+            return self._fail(serial, e)
+        except Exception as e:
+            self._finish(timing, e)
+            return self._fail(serial, e)
+        self._finish(timing)
+
+        if packages is None:
+            self.cache.refresh(entry)
+            packages = entry["packages"]
+            if self.catalog is not None:
+                self.catalog.record(serial, packages)
+            return self._report(serial, packages, " (not modified)")
+
+        if self.catalog is not None:
+            self.catalog.record(serial, packages)
+
+        if self.cache:
+            self.cache.put(
+                url, packages,
+                etag=r.headers.get("ETag"),
+                last_modified=r.headers.get("Last-Modified")
+            )
+        return self._report(serial, packages)
+
+    def _finish(self, timing, exc=None):
+        if self.metrics is not None:
+            timing.finish(describe_error(exc) if exc is not None else None)
+            self.metrics.record(timing)
+
+    def _fail(self, serial, exc):
+        reason = describe_error(exc)
+        self.failures[serial] = reason
+        count = len(self.failures)
+        if count <= self.FAILURE_LOG_LIMIT:
+            self.log(f"  ✗ {serial} failed: {reason}")
+        elif count == self.FAILURE_LOG_LIMIT + 1:
+            self.log(f"  ✗ More than {self.FAILURE_LOG_LIMIT} serials failed, "
+                     f"not logging the rest one by one")
+        return []
+
+    def _progress(self, msg):
+        if self.verbose:
+            self.log(msg)
+
+    def _report(self, serial, packages, note=""):
+        if packages:
+            self._progress(f"  Found {len(packages)} package(s) for {serial}{note}")
+        else:
+            self._progress(f"  No packages found for {serial}{note}")
+        return packages
+
+    def _fetch_function(self):
+        if self.profiler is not None:
+            return self.profiler.wrap(self.fetch_one)
+        return self.fetch_one
+
+    def fetch_iter(self, serials):
+        """Yield ``(serial, packages)`` for each serial as soon as it is done.
+
+        Serials are taken from the iterable lazily with only a few more in
+        flight than there are workers, so arbitrarily long scans (e.g. a
+        serial range) run in constant memory. Results come in completion
+        order.
+        """
+        for serial, packages, _ in self._run(serials, partial=False):
+            yield serial, packages
+
+    def fetch_stream(self, serials):
+        """Like ``fetch_iter``, but also yield packages while manifests are parsed.
+
+        Yields ``(serial, packages, done)``: a serial comes up once per group
+        of packages parsed from its response, and a last time with ``done``
+        set and whatever was not yielded yet, possibly nothing.
+        """
+        return self._run(serials, partial=True)
+
+    def _run(self, serials, partial):
+        serials = iter(serials)
+        self.failures = {}
+        window = self.max_workers * 2
+        fetch_one = self._fetch_function()
+        events = queue.SimpleQueue()
+
+        def run(serial):
+            if not partial:
+                return serial, fetch_one(serial)
+            sent = 0
+
+            def deliver(packages):
+                nonlocal sent
+                sent += len(packages)
+                events.put((serial, packages, False))
+
+            return serial, fetch_one(serial, deliver)[sent:]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = 0
+            while True:
+                for serial in itertools.islice(serials, window - running):
+                    pool.submit(run, serial).add_done_callback(events.put)
+                    running += 1
+                if not running:
+                    break
+                event = events.get()
+                if isinstance(event, Future):
+                    running -= 1
+                    serial, packages = event.result()
+                    yield serial, packages, True
+                else:
+                    yield event
+
+        if self.cache:
+            self.cache.prune()
+
+    def fetch_all(self, serials):
+        """Fetch every serial in parallel and merge the results in input order.
+
+        A package listed under several serials or tags is returned once.
+        """
+        serials = list(serials)
+        self.failures = {}
+        if not serials:
+            return []
+
+        workers = min(self.max_workers, len(serials))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(self._fetch_function(), serials)
+            found = 0
+            all_packages = []
+            for packages in results:
+                found += len(packages)
+                all_packages.extend(packages)
+            all_packages = list(unique_packages(all_packages))
+
+        if found > len(all_packages):
+            self.log(f"Skipped {found - len(all_packages)} duplicate package(s)")
+
+        if self.cache:
+            self.cache.prune()
+        return all_packages
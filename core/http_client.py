@@ -0,0 +1,126 @@
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.connection import allowed_gai_family
+
+from .metrics import current_timing
+
+
+class TimedConnectionMixin:
+    """Charges DNS, TCP connect and TLS time of new connections to the active RequestTiming."""
+
+    def _new_conn(self):
+        timing = current_timing()
+        if timing is None:
+            return super()._new_conn()
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except OSError:
+            # Let urllib3 fail the lookup again and report it its own way
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        timing.add_connection("dns", resolved - started)
+
+        # Connect to the resolved addresses in order, as urllib3 would
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        try:
+            for address in addresses:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except ConnectTimeoutError:
+                    if address == addresses[-1]:
+                        raise
+        finally:
+            self._dns_host = host
+            self._connected_at = time.perf_counter()
+            timing.add_connection("connect", self._connected_at - resolved)
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+
+    def connect(self):
+        self._connected_at = None
+        super().connect()
+        timing = current_timing()
+        if timing is not None and self._connected_at is not None:
+            timing.add_connection("tls", time.perf_counter() - self._connected_at)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose direct connections report their setup phases."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+class HttpClient:
+    """Process-wide pooled HTTP session shared by the fetch and download workers.
+
+    Connections are kept alive between requests and between worker runs, so
+    repeated hits to the same update server skip the TCP/TLS handshake. New
+    connections report their setup time to the active RequestTiming.
+    """
+
+    DEFAULT_POOL_SIZE = 10
+
+    _session = None
+    _pool_size = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def session(cls, pool_size=None):
+        """Return the shared session, rebuilding it if the pool size changed.
+
+        Without a pool size the current session is reused as-is.
+        """
+        with cls._lock:
+            if pool_size is None:
+                pool_size = cls._pool_size or cls.DEFAULT_POOL_SIZE
+            if cls._session is None or cls._pool_size != pool_size:
+                if cls._session is not None:
+                    cls._session.close()
+                cls._session = cls._build(pool_size)
+                cls._pool_size = pool_size
+            return cls._session
+
+    @classmethod
+    def close(cls):
+        """Close the shared session and drop all pooled connections."""
+        with cls._lock:
+            if cls._session is not None:
+                cls._session.close()
+            cls._session = None
+            cls._pool_size = None
+
+    @staticmethod
+    def _build(pool_size):
+        session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
@@ -0,0 +1,90 @@
+import json
+import os
+import threading
+import time
+
+
+class TransferJournal:
+    """Sidecar record of how many bytes of a ``.part`` file are committed.
+
+    Each segment is stored as ``[start, end, committed]``; ``end`` is None when
+    the total size is unknown. The journal never claims more than what has
+    been flushed to the part file, so a resume may re-fetch a few bytes but
+    never skips any.
+    """
+
+    SAVE_INTERVAL = 1.0  # seconds between periodic saves
+
+    def __init__(self, path, url, size, segments):
+        self.path = path
+        self.url = url
+        self.size = size
+        self.segments = [list(segment) for segment in segments]
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+
+    @classmethod
+    def create(cls, path, url, size, ranges):
+        """Create a fresh journal for the given (start, end) ranges."""
+        journal = cls(path, url, size, [(start, end, 0) for start, end in ranges])
+        journal.save()
+        return journal
+
+    @classmethod
+    def load(cls, path, url, size):
+        """Load a journal for the same url and size, or None if it does not match."""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            if data["url"] != url or data["size"] != size:
+                return None
+            segments = [
+                (int(start), None if end is None else int(end), int(committed))
+                for start, end, committed in data["segments"]
+            ]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return cls(path, url, size, segments)
+
+    @property
+    def committed(self):
+        """Total number of bytes committed across all segments."""
+        with self._lock:
+            return sum(segment[2] for segment in self.segments)
+
+    def position(self, index):
+        """Return the next (offset, end) to fetch for a segment."""
+        with self._lock:
+            start, end, committed = self.segments[index]
+            return start + committed, end
+
+    def advance(self, index, nbytes):
+        """Record ``nbytes`` more flushed bytes for a segment."""
+        with self._lock:
+            self.segments[index][2] += nbytes
+            due = time.monotonic() - self._last_save >= self.SAVE_INTERVAL
+        if due:
+            self.save()
+
+    def reset(self, index):
+        """Forget everything committed for a segment."""
+        with self._lock:
+            self.segments[index][2] = 0
+        self.save()
+
+    def save(self):
+        """Atomically write the journal to disk."""
+        with self._lock:
+            data = {"url": self.url, "size": self.size, "segments": self.segments}
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+            self._last_save = time.monotonic()
+
+    def remove(self):
+        """Delete the journal file."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
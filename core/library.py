@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import threading
+
+
+class LibraryIndex:
+    """Persistent index of the packages already present in the output directory.
+
+    Stores name, size, mtime and (once known) the SHA-1 of every file so the
+    downloader can skip packages that are already on disk. Hashes are only
+    computed when a manifest checksum needs to be compared and are reused
+    for as long as the file's size and mtime stay the same.
+    """
+
+    FORMAT = 1
+    INDEX_FILE = ".pkgfetcher-index.json"
+    HASH_CHUNK = 1024 * 1024
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, self.INDEX_FILE)
+        self.files = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+        self.refresh()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("format") == self.FORMAT:
+            self.files = data.get("files", {})
+
+    def save(self):
+        """Write the index to disk if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"format": self.FORMAT, "files": self.files}
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w") as f:
+                    json.dump(data, f)
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except OSError as e:
+                print(f"Error saving library index: {e}")
+
+    def refresh(self):
+        """Sync the index with the directory, dropping stale entries."""
+        seen = {}
+        try:
+            with os.scandir(self.directory) as it:
+                for item in it:
+                    if item.is_file() and item.name.lower().endswith(".pkg"):
+                        seen[item.name] = item.stat()
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            for name in list(self.files):
+                if name not in seen:
+                    del self.files[name]
+                    self._dirty = True
+            for name, stat in seen.items():
+                self._update(name, stat)
+
+    def _update(self, name, stat, sha1=None):
+        """Record a file's stat, keeping its hash only if it is still valid."""
+        entry = self.files.get(name)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            if sha1 and entry.get("sha1") != sha1:
+                entry["sha1"] = sha1
+                self._dirty = True
+            return entry
+
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime, "sha1": sha1}
+        self.files[name] = entry
+        self._dirty = True
+        return entry
+
+    def record(self, name, sha1=None):
+        """Add or update a file after it has been written."""
+        try:
+            stat = os.stat(os.path.join(self.directory, name))
+        except OSError:
+            return
+        with self._lock:
+            self._update(name, stat, sha1)
+
+    def has(self, name, size, sha1=None):
+        """Return True if a file with this name, size and checksum is present."""
+        path = os.path.join(self.directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self._lock:
+                if self.files.pop(name, None) is not None:
+                    self._dirty = True
+            return False
+
+        with self._lock:
+            entry = self._update(name, stat)
+        if not size or entry["size"] != size:
+            return False
+        if not sha1:
+            return True
+
+        if not entry.get("sha1"):
+            digest = self._hash_file(path)
+            with self._lock:
+                entry = self._update(name, stat, digest)
+        return entry.get("sha1") == sha1.lower()
+
+    def _hash_file(self, path):
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(self.HASH_CHUNK), b""):
+                h.update(block)
+        return h.hexdigest()
@@ -0,0 +1,98 @@
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+
+logger = logging.getLogger("pkgfetcher")
+logger.setLevel(logging.WARNING)
+
+
+class LogBuffer:
+    """Collects log lines from worker threads and delivers them in batches.
+
+    ``sink`` receives a list of lines at most every ``interval`` seconds, or
+    as soon as ``max_batch`` lines are waiting. Every line is also mirrored to
+    the ``pkgfetcher.<source>`` logger for the optional log file.
+    """
+
+    def __init__(self, sink, interval=0.1, max_batch=200, source="app"):
+        self.sink = sink
+        self.interval = interval
+        self.max_batch = max_batch
+        self.logger = logger.getChild(source)
+        self._lines = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def write(self, msg):
+        """Queue a line for the next batch."""
+        self.logger.info(msg)
+        with self._lock:
+            self._lines.append(msg)
+            if len(self._lines) >= self.max_batch:
+                self._deliver()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Deliver everything queued so far."""
+        with self._lock:
+            self._deliver()
+
+    def _deliver(self):
+        # Called with the lock held so batches keep their order
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._lines:
+            lines, self._lines = self._lines, []
+            self.sink(lines)
+
+
+class JsonLogFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record):
+        return json.dumps({
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+                    + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "source": record.name,
+            "message": record.getMessage()
+        }, ensure_ascii=False)
+
+
+_file_handler = None
+_file_handler_lock = threading.Lock()
+
+
+def configure_file_log(path, max_bytes=5 * 1024 * 1024, backup_count=3):
+    """Mirror all log lines to a rotating JSON-lines file; an empty path disables it."""
+    global _file_handler
+    with _file_handler_lock:
+        if _file_handler is not None:
+            if path and _file_handler.baseFilename == os.path.abspath(path):
+                return
+            logger.removeHandler(_file_handler)
+            _file_handler.close()
+            _file_handler = None
+            logger.setLevel(logging.WARNING)
+
+        if not path:
+            return
+        try:
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+            )
+        except OSError as e:
+            print(f"Error opening log file: {e}")
+            return
+        handler.setFormatter(JsonLogFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        _file_handler = handler
+
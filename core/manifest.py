@@ -0,0 +1,56 @@
+import xml.etree.ElementTree as ET
+
+from .package import Package
+
+
+def iter_manifest(chunks, serial):
+    """Parse an update manifest incrementally and yield its packages.
+
+    ``chunks`` is an iterable of bytes (e.g. a streamed response body). Each
+    ``<package>`` is yielded as soon as its closing tag has been read, and
+    processed elements are dropped so memory stays flat on large manifests.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack = []
+    tag_name = None
+
+    def drain():
+        nonlocal tag_name
+        for event, elem in parser.read_events():
+            if event == "start":
+                stack.append(elem)
+                if len(stack) == 2 and elem.tag == "tag":
+                    tag_name = elem.attrib.get("name")
+                continue
+
+            stack.pop()
+            depth = len(stack)
+            if depth > 2:
+                continue
+            if depth == 2 and elem.tag == "package" and stack[1].tag == "tag":
+                attrib = elem.attrib
+                yield Package(
+                    elem.findtext(".//TITLE"),
+                    tag_name,
+                    attrib.get("version"),
+                    int(attrib.get("size", 0)),
+                    attrib.get("url"),
+                    attrib.get("sha1sum"),
+                    serial
+                )
+            if depth:
+                # Children of the root and of <tag> are done with once closed
+                stack[-1].remove(elem)
+
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        parser.feed(chunk)
+        yield from drain()
+    parser.close()
+    yield from drain()
+
+
+def parse_manifest(text, serial):
+    """Parse an update manifest and return its packages as a list."""
+    return list(iter_manifest([text], serial))
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from .package import Package
+
+
+class ManifestCache:
+    """On-disk cache of parsed manifests keyed by their formatted URL.
+
+    Each entry is a small JSON file holding the parsed packages together with
+    the ``ETag``/``Last-Modified`` validators of the response. Missing
+    manifests are remembered as entries without packages for a shorter TTL.
+    File modification times double as last-access times for LRU eviction.
+    """
+
+    FORMAT = 2
+    # Other state kept in the same directory is left alone by prune/clear
+    ENTRY_NAME = re.compile(r"[0-9a-f]{40}\.json")
+
+    def __init__(self, directory, ttl=86400, negative_ttl=3600,
+                 max_size=64 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(
+            self.directory, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json"
+        )
+
+    def get(self, url):
+        """Return the cached entry for a url, or None."""
+        path = self._path(url)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("format") != self.FORMAT or entry.get("url") != url:
+            return None
+        if entry["packages"] is not None:
+            entry["packages"] = [Package.from_dict(pkg) for pkg in entry["packages"]]
+
+        # Mark as recently used for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def is_fresh(self, entry):
+        """Return True if an entry can be used without contacting the server."""
+        ttl = self.ttl if entry["packages"] is not None else self.negative_ttl
+        return time.time() - entry["fetched_at"] < ttl
+
+    @staticmethod
+    def validators(entry):
+        """Return conditional request headers for revalidating an entry."""
+        headers = {}
+        if entry is None or entry["packages"] is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, packages, etag=None, last_modified=None):
+        """Store the parsed packages of a manifest."""
+        self._write(url, {
+            "format": self.FORMAT,
+            "url": url,
+            "fetched_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "packages": None if packages is None else [pkg.to_dict() for pkg in packages]
+        })
+
+    def put_missing(self, url):
+        """Remember that a url has no manifest."""
+        self.put(url, None)
+
+    def refresh(self, entry):
+        """Mark an entry as revalidated now."""
+        entry["fetched_at"] = time.time()
+        self.put(entry["url"], entry["packages"], entry.get("etag"), entry.get("last_modified"))
+
+    def _write(self, url, entry):
+        path = self._path(url)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Error writing manifest cache: {e}")
+
+    def prune(self):
+        """Evict least recently used entries until the cache fits its size limit."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if not self.ENTRY_NAME.fullmatch(item.name):
+                    continue
+                stat = item.stat()
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove every cached entry."""
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if self.ENTRY_NAME.fullmatch(item.name):
+                    try:
+                        os.remove(item.path)
+                    except OSError:
+                        pass
@@ -0,0 +1,405 @@
+import cProfile
+import csv
+import functools
+import json
+import math
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Phases a request's time is split into, in the order they happen. The
+# connection phases only appear for requests that opened a new connection.
+PHASES = ("dns", "connect", "tls", "ttfb", "transfer", "parse", "throttle", "disk")
+
+_local = threading.local()
+
+
+def current_timing():
+    """Return the RequestTiming active on this thread, or None."""
+    return getattr(_local, "timing", None)
+
+
+class RequestTiming:
+    """Phase timings, bytes, retries and outcome of one fetch or download.
+
+    A timing is made ``active`` on every thread working for it, so the HTTP
+    client can charge DNS lookups, TCP connects and TLS handshakes of new
+    connections to it. Phases are summed over retries and segments; the
+    disk phase is measured on the writer thread and overlaps the transfer.
+    """
+
+    def __init__(self, kind, url, name=""):
+        self.kind = kind
+        self.url = url
+        self.host = urlsplit(url).netloc
+        self.name = name
+        self.started_at = time.time()
+        self.duration = None
+        self.phases = {}
+        self.bytes = 0
+        self.retries = 0
+        self.status = None
+        self.error = None
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds, nbytes=0):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+            self.bytes += nbytes
+
+    def get(self, phase):
+        with self._lock:
+            return self.phases.get(phase, 0.0)
+
+    def add_connection(self, phase, seconds):
+        """Charge connection setup, which ``first_byte`` leaves out of ``ttfb``."""
+        _local.setup = getattr(_local, "setup", 0.0) + seconds
+        self.add(phase, seconds)
+
+    @contextmanager
+    def active(self):
+        """Make this the timing of the current thread."""
+        previous = getattr(_local, "timing", None)
+        _local.timing = self
+        try:
+            yield self
+        finally:
+            _local.timing = previous
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    @contextmanager
+    def first_byte(self):
+        """Time sending a request until its response headers arrive."""
+        setup = getattr(_local, "setup", 0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started - (getattr(_local, "setup", 0.0) - setup)
+            self.add("ttfb", max(elapsed, 0.0))
+
+    def iterate(self, chunks, phase="transfer"):
+        """Yield from ``chunks``, charging the time spent waiting for each to ``phase``."""
+        spent = 0.0
+        nbytes = 0
+        chunks = iter(chunks)
+        try:
+            while True:
+                started = time.perf_counter()
+                chunk = next(chunks, None)
+                spent += time.perf_counter() - started
+                if chunk is None:
+                    return
+                nbytes += len(chunk)
+                yield chunk
+        finally:
+            self.add(phase, spent, nbytes)
+
+    def finish(self, error=None):
+        self.duration = time.perf_counter() - self._started
+        self.error = error
+
+    def as_event(self):
+        """Return the timing as a flat, JSON-friendly dict."""
+        event = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "kind": self.kind,
+            "host": self.host,
+            "name": self.name,
+            "status": self.status,
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "error": self.error,
+            "duration": round(self.duration or 0.0, 6),
+        }
+        with self._lock:
+            for phase in PHASES:
+                event[phase] = round(self.phases.get(phase, 0.0), 6)
+        return event
+
+
+class Histogram:
+    """Fixed-size log-scale histogram of durations in seconds.
+
+    Buckets grow by a factor of sqrt(2) from 0.1 ms, so percentiles are
+    estimated within about 20% whatever the number of samples.
+    """
+
+    FIRST = 0.0001
+    FACTOR = math.sqrt(2)
+    BUCKETS = 64
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def add(self, value):
+        if value <= self.FIRST:
+            index = 0
+        else:
+            index = min(self.BUCKETS - 1, math.ceil(math.log(value / self.FIRST, self.FACTOR)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        """Estimate the ``q``-th percentile, interpolating within its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                low = 0.0 if index == 0 else self.FIRST * self.FACTOR ** (index - 1)
+                high = self.FIRST * self.FACTOR ** index
+                value = low + (high - low) * (rank - seen) / count
+                return min(max(value, self.min), self.max)
+            seen += count
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 6) if self.count else 0.0,
+            "p50": round(self.percentile(50), 6),
+            "p90": round(self.percentile(90), 6),
+            "p99": round(self.percentile(99), 6),
+            "max": round(self.max, 6),
+        }
+
+
+class Metrics:
+    """Collects finished RequestTimings and aggregates them per host.
+
+    The last ``max_events`` timings are kept as events for export; the
+    per-host request counts, bytes, retries, errors and phase histograms
+    cover everything recorded. Every timing is also recorded in the
+    optional ``parent``, so a batch's own metrics can feed the shared ones.
+    """
+
+    MAX_EVENTS = 10000
+    QUANTILES = (50, 90, 99)
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_events=MAX_EVENTS, parent=None):
+        self.parent = parent
+        self.events = deque(maxlen=max_events)
+        self._hosts = {}  # (host, kind) -> stats dict
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide metrics used by all batches."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def record(self, timing):
+        event = timing.as_event()
+        with self._lock:
+            self.events.append(event)
+            stats = self._hosts.get((timing.host, timing.kind))
+            if stats is None:
+                stats = {"requests": 0, "errors": 0, "retries": 0, "bytes": 0, "phases": {}}
+                self._hosts[(timing.host, timing.kind)] = stats
+            stats["requests"] += 1
+            stats["errors"] += event["error"] is not None
+            stats["retries"] += timing.retries
+            stats["bytes"] += timing.bytes
+            phases = stats["phases"]
+            for phase in PHASES + ("total",):
+                value = event["duration"] if phase == "total" else event[phase]
+                if phase == "total" or value:
+                    histogram = phases.get(phase)
+                    if histogram is None:
+                        histogram = phases[phase] = Histogram()
+                    histogram.add(value)
+        if self.parent is not None:
+            self.parent.record(timing)
+
+    def summary(self):
+        """Return ``{host: {kind: stats}}`` with percentiles of every phase."""
+        result = {}
+        with self._lock:
+            for (host, kind), stats in sorted(self._hosts.items()):
+                result.setdefault(host, {})[kind] = {
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "retries": stats["retries"],
+                    "bytes": stats["bytes"],
+                    "phases": {phase: histogram.summary()
+                               for phase, histogram in stats["phases"].items()},
+                }
+        return result
+
+    def write_report(self, path):
+        """Write the events as CSV for a ``.csv`` path, else summary and events as JSON."""
+        with self._lock:
+            events = list(self.events)
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=list(RequestTiming("", "").as_event()))
+                writer.writeheader()
+                writer.writerows(events)
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "hosts": self.summary(),
+                "events": events,
+            }, f, indent=2, ensure_ascii=False)
+
+    def prometheus(self):
+        """Return the aggregates in the Prometheus text exposition format."""
+        lines = [
+            "# TYPE pkgfetcher_requests_total counter",
+            "# TYPE pkgfetcher_errors_total counter",
+            "# TYPE pkgfetcher_retries_total counter",
+            "# TYPE pkgfetcher_bytes_total counter",
+            "# TYPE pkgfetcher_phase_seconds summary",
+        ]
+        for host, kinds in self.summary().items():
+            for kind, stats in kinds.items():
+                labels = f'host="{_escape(host)}",kind="{kind}"'
+                for name in ("requests", "errors", "retries", "bytes"):
+                    lines.append(f"pkgfetcher_{name}_total{{{labels}}} {stats[name]}")
+                for phase, s in stats["phases"].items():
+                    phase_labels = f'{labels},phase="{phase}"'
+                    for q in self.QUANTILES:
+                        lines.append(f'pkgfetcher_phase_seconds{{{phase_labels},'
+                                     f'quantile="{q / 100}"}} {s[f"p{q}"]}')
+                    lines.append(f"pkgfetcher_phase_seconds_sum{{{phase_labels}}} "
+                                 f"{s['mean'] * s['count']:.6f}")
+                    lines.append(f"pkgfetcher_phase_seconds_count{{{phase_labels}}} {s['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        metrics = self.server.metrics
+        path = urlsplit(self.path).path
+        if path == "/metrics":
+            body = metrics.prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(metrics.summary(), indent=2).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Serves metrics on ``127.0.0.1:port`` at ``/metrics`` and ``/metrics.json``.
+
+    ``/metrics`` is in the Prometheus text format, ``/metrics.json`` is the
+    per-host summary.
+    """
+
+    daemon_threads = True
+
+    _running = None
+    _running_lock = threading.Lock()
+
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        super().__init__((host, port), MetricsHandler)
+        self.metrics = metrics
+
+    @classmethod
+    def serve(cls, metrics, port):
+        """Keep one server running on ``port``; 0 stops it.
+
+        Raises OSError if the port cannot be opened.
+        """
+        with cls._running_lock:
+            running = cls._running
+            if running is not None:
+                if port and running.server_address[1] == port and running.metrics is metrics:
+                    return running
+                running.shutdown()
+                running.server_close()
+                cls._running = None
+            if not port:
+                return None
+            server = cls(metrics, port)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            cls._running = server
+            return server
+
+
+class Profiler:
+    """Profiles calls running on many threads into one set of statistics.
+
+    Each call of a wrapped function runs under its own cProfile profiler and
+    the results are merged when it returns. Calls made while the thread is
+    already being profiled are counted in the outer call.
+    """
+
+    def __init__(self):
+        self._stats = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def wrap(self, func):
+        @functools.wraps(func)
+        def profiled(*args, **kwargs):
+            if getattr(self._local, "active", False):
+                return func(*args, **kwargs)
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one profiler at a time per process
+                return func(*args, **kwargs)
+            self._local.active = True
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                self._local.active = False
+                with self._lock:
+                    if self._stats is None:
+                        self._stats = pstats.Stats(profile)
+                    else:
+                        self._stats.add(profile)
+        return profiled
+
+    def save(self, path):
+        """Dump the merged statistics for pstats/snakeviz; False if nothing ran."""
+        with self._lock:
+            if self._stats is None:
+                return False
+            self._stats.dump_stats(path)
+        return True
@@ -0,0 +1,56 @@
+import sys
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Package:
+    """One downloadable package from an update manifest.
+
+    Records use ``__slots__`` instead of a per-instance dict, and the strings
+    that repeat across packages (title, tag, version, serial) are interned so
+    large batches share a single copy of each.
+    """
+
+    __slots__ = ("title", "tag", "version", "size", "url", "sha1", "serial")
+
+    def __init__(self, title, tag, version, size, url, sha1=None, serial=None):
+        self.title = _intern(title)
+        self.tag = _intern(tag)
+        self.version = _intern(version)
+        self.size = size
+        self.url = url
+        self.sha1 = sha1
+        self.serial = _intern(serial)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a package from the dict produced by ``to_dict``."""
+        return cls(
+            data.get("title"), data.get("tag"), data.get("version"),
+            data.get("size") or 0, data.get("url"), data.get("sha1"), data.get("serial")
+        )
+
+    def to_dict(self):
+        """Return the package as a plain dict, e.g. for JSON."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        if not isinstance(other, Package):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Package({self.serial!r}, {self.tag!r}, {self.version!r}, {self.url!r})"
+
+
+def unique_packages(packages):
+    """Yield packages in order, skipping any whose URL was already seen."""
+    seen = set()
+    for pkg in packages:
+        if pkg.url not in seen:
+            seen.add(pkg.url)
+            yield pkg
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import deque
+
+
+class TransferProgress:
+    """Thread-safe byte counter for a batch of downloads.
+
+    Transfers report every chunk through ``add``; ``callback`` receives a
+    snapshot with overall and per-package progress, current and average
+    throughput and an ETA, at most once per ``interval`` seconds.
+    """
+
+    def __init__(self, packages=(), interval=0.25, window=5.0, callback=None):
+        self.interval = interval
+        self.window = window
+        self.callback = callback or (lambda snapshot: None)
+        self.items = {}
+        for pkg in packages:
+            self.items[pkg.url] = [0, pkg.size or 0, False]
+        self._lock = threading.Lock()
+        self._samples = deque()
+        self._started = time.monotonic()
+        self._transferred = 0
+        self._last_emit = 0.0
+
+    def begin(self, key, size, done=0):
+        """Start (or restart) a transfer with ``done`` bytes already on disk."""
+        with self._lock:
+            self.items[key] = [done, size, False]
+        self._maybe_emit()
+
+    def add(self, key, nbytes):
+        """Record ``nbytes`` freshly received for a transfer."""
+        now = time.monotonic()
+        with self._lock:
+            self.items[key][0] += nbytes
+            self._transferred += nbytes
+            self._samples.append((now, nbytes))
+        self._maybe_emit(now)
+
+    def complete(self, key):
+        """Mark a transfer (or a skipped package) as done."""
+        with self._lock:
+            item = self.items.setdefault(key, [0, 0, False])
+            item[0] = max(item[0], item[1])
+            item[2] = True
+        self._maybe_emit()
+
+    def flush(self):
+        """Emit a snapshot now regardless of the interval."""
+        self._maybe_emit(force=True)
+
+    def _maybe_emit(self, now=None, force=False):
+        now = now or time.monotonic()
+        with self._lock:
+            if not force and now - self._last_emit < self.interval:
+                return
+            self._last_emit = now
+            snapshot = self._snapshot(now)
+        self.callback(snapshot)
+
+    def _snapshot(self, now):
+        while self._samples and now - self._samples[0][0] > self.window:
+            self._samples.popleft()
+
+        done = sum(item[0] for item in self.items.values())
+        total = sum(item[1] for item in self.items.values())
+        finished = sum(1 for item in self.items.values() if item[2])
+
+        elapsed = now - self._started
+        average = self._transferred / elapsed if elapsed > 0 else 0.0
+        if self._samples:
+            span = max(now - self._samples[0][0], self.interval)
+            speed = sum(nbytes for _, nbytes in self._samples) / span
+        else:
+            speed = 0.0
+
+        if total:
+            percent = min(100, int(done / total * 100))
+        else:
+            percent = int(finished / len(self.items) * 100) if self.items else 0
+
+        rate = speed or average
+        eta = (total - done) / rate if total and rate else None
+
+        return {
+            "done": done,
+            "total": total,
+            "percent": percent,
+            "speed": speed,
+            "average": average,
+            "eta": eta,
+            "finished": finished,
+            "count": len(self.items),
+            "items": {
+                key: {"done": item[0], "size": item[1], "finished": item[2]}
+                for key, item in self.items.items()
+            }
+        }
+
+
+def format_bytes(size):
+    """Format a byte count for display, e.g. ``12.34 MB``."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.2f} {unit}"
+        size /= 1024
+    return f"{size:.2f} TB"
+
+
+def format_duration(seconds):
+    """Format a number of seconds as ``h:mm:ss`` or ``m:ss``."""
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
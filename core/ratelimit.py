@@ -0,0 +1,178 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Bytes-per-second token bucket that may be overdrawn.
+
+    A take is admitted whenever the balance is not negative, even if it is
+    larger than the burst; the debt is then paid back before the next take,
+    so chunks of any size still average out to ``rate``.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "stamp")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def delay(self):
+        """Seconds until the balance is back to zero."""
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class BandwidthLimiter:
+    """Caps the download rate shared by every transfer.
+
+    There is an optional global limit plus optional per-host limits, all in
+    bytes per second, and both can be changed while transfers are running.
+    Transfers marked ``HIGH`` priority get global bandwidth before ``NORMAL``
+    ones. With no limits set, ``acquire`` returns immediately without
+    taking a lock.
+    """
+
+    HIGH, NORMAL = range(2)
+
+    # Seconds of traffic a bucket can save up while idle
+    BURST = 0.25
+
+    # Re-check interval while a more urgent transfer is waiting
+    POLL = 0.05
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, rate=0, host_rates=None):
+        self._cond = threading.Condition()
+        self._global = None
+        self._hosts = {}
+        self._priorities = {}
+        self._waiting = [0, 0]
+        self.priority_version = 0
+        self.active = False
+        self.set_limits(rate, host_rates)
+
+    @classmethod
+    def shared(cls):
+        """Return the limiter shared by all downloads in this process."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    # ---------- Limits ----------
+
+    def set_limits(self, rate, host_rates=None):
+        """Replace the global and per-host limits; 0 means unlimited."""
+        with self._cond:
+            self._global = self._bucket(rate, self._global)
+            host_rates = host_rates or {}
+            self._hosts = {
+                host: self._bucket(host_rate, self._hosts.get(host))
+                for host, host_rate in host_rates.items() if host_rate > 0
+            }
+            self._changed()
+
+    def set_rate(self, rate):
+        """Change only the global limit; 0 means unlimited."""
+        with self._cond:
+            self._global = self._bucket(rate, self._global)
+            self._changed()
+
+    @property
+    def rate(self):
+        bucket = self._global
+        return bucket.rate if bucket is not None else 0
+
+    def _bucket(self, rate, bucket):
+        if not rate or rate <= 0:
+            return None
+        if bucket is None:
+            return TokenBucket(rate, int(rate * self.BURST))
+        bucket.refill(time.monotonic())
+        bucket.rate = rate
+        bucket.capacity = max(1, int(rate * self.BURST))
+        bucket.tokens = min(bucket.tokens, bucket.capacity)
+        return bucket
+
+    def _changed(self):
+        self.active = self._global is not None or bool(self._hosts)
+        self._cond.notify_all()
+
+    # ---------- Priorities ----------
+
+    def set_priority(self, key, priority):
+        """Set the priority class of a transfer (e.g. by package URL)."""
+        with self._cond:
+            if priority == self.NORMAL:
+                self._priorities.pop(key, None)
+            else:
+                self._priorities[key] = priority
+            self.priority_version += 1
+            self._cond.notify_all()
+
+    def priority(self, key):
+        return self._priorities.get(key, self.NORMAL)
+
+    def clear_priorities(self, keys):
+        """Forget the priorities of finished transfers."""
+        with self._cond:
+            for key in keys:
+                self._priorities.pop(key, None)
+            self.priority_version += 1
+
+    # ---------- Transfers ----------
+
+    def acquire(self, key, host, nbytes):
+        """Block until ``nbytes`` received for transfer ``key`` fit the limits."""
+        if not self.active:
+            return
+
+        with self._cond:
+            queued = None
+            try:
+                while self.active:
+                    now = time.monotonic()
+                    host_bucket = self._hosts.get(host)
+                    wait = 0.0
+                    if host_bucket is not None:
+                        host_bucket.refill(now)
+                        wait = host_bucket.delay()
+
+                    priority = self._priorities.get(key, self.NORMAL)
+                    if wait or self._global is None:
+                        queued = self._queue(queued, None)
+                    else:
+                        queued = self._queue(queued, priority)
+                        self._global.refill(now)
+                        wait = self._global.delay()
+                        if not wait and any(self._waiting[:priority]):
+                            # Leave the bandwidth to a more urgent transfer
+                            wait = self.POLL
+
+                    if not wait:
+                        for bucket in (host_bucket, self._global):
+                            if bucket is not None:
+                                bucket.tokens -= nbytes
+                        return
+                    self._cond.wait(wait)
+            finally:
+                if queued is not None:
+                    self._waiting[queued] -= 1
+                    self._cond.notify_all()
+
+    def _queue(self, queued, priority):
+        # Move this transfer's entry in the global wait counts
+        if queued == priority:
+            return queued
+        if queued is not None:
+            self._waiting[queued] -= 1
+        if priority is not None:
+            self._waiting[priority] += 1
+        return priority
@@ -0,0 +1,164 @@
+import http.client
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+
+
+class HostUnavailable(RuntimeError):
+    """Raised without sending a request while a host's circuit breaker is open."""
+
+
+def describe_error(exc):
+    """Return a short, log-friendly reason for a failed request."""
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return f"HTTP {exc.response.status_code}"
+    if isinstance(exc, (requests.Timeout, urllib3.exceptions.TimeoutError, TimeoutError)):
+        return "timed out"
+    if isinstance(exc, requests.ConnectionError):
+        return "connection failed"
+    if isinstance(exc, ConnectionError):
+        return str(exc) or "connection failed"
+    return str(exc) or type(exc).__name__
+
+
+class CircuitBreaker:
+    """Stops sending requests to a host that keeps failing.
+
+    After ``threshold`` consecutive transient failures the host's circuit
+    opens and ``check`` fails fast with HostUnavailable for ``cooldown``
+    seconds. Then a single request is let through as a probe: success closes
+    the circuit, another failure opens it again. A threshold of 0 disables
+    the breaker.
+    """
+
+    def __init__(self, threshold=5, cooldown=30):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._hosts = {}  # host -> [failures, opened_at, probing]
+        self._lock = threading.Lock()
+
+    def check(self, host):
+        """Raise HostUnavailable if requests to ``host`` should not be sent."""
+        if not self.threshold:
+            return
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state[1] is None:
+                return
+            remaining = state[1] + self.cooldown - time.monotonic()
+            if remaining <= 0 and not state[2]:
+                state[2] = True
+                return
+        raise HostUnavailable(
+            f"{host} is not responding (paused for {max(remaining, 0):.0f}s)"
+        )
+
+    def record(self, host, ok):
+        """Account for a finished request; only transient failures count."""
+        if not self.threshold:
+            return
+        with self._lock:
+            if ok:
+                self._hosts.pop(host, None)
+                return
+            state = self._hosts.setdefault(host, [0, None, False])
+            state[0] += 1
+            state[2] = False
+            if state[0] >= self.threshold:
+                state[1] = time.monotonic()
+
+    def is_open(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            return state is not None and state[1] is not None
+
+
+class RetryPolicy:
+    """Retries transient request failures with exponential backoff and jitter.
+
+    Timeouts, dropped connections, 408, 429 and 5xx responses are retried
+    up to ``retries`` times, waiting a random time of up to ``BASE_DELAY *
+    2**attempt`` seconds (capped at ``MAX_DELAY``) in between so that many
+    workers do not retry in lockstep. A 404 or any other client error is
+    final. Every outcome is reported to the optional ``breaker``.
+    """
+
+    BASE_DELAY = 0.5
+    MAX_DELAY = 8.0
+    RETRY_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+    def __init__(self, retries=3, breaker=None):
+        self.retries = max(0, retries)
+        self.breaker = breaker
+
+    @classmethod
+    def is_transient(cls, exc):
+        """Whether a failure is worth retrying."""
+        if isinstance(exc, HostUnavailable):
+            return False
+        if isinstance(exc, requests.HTTPError):
+            return exc.response is not None and exc.response.status_code in cls.RETRY_STATUS
+        return isinstance(exc, (
+            requests.Timeout,
+            requests.ConnectionError,
+            requests.exceptions.ChunkedEncodingError,
+            urllib3.exceptions.HTTPError,
+            http.client.HTTPException,
+            TimeoutError,
+            ConnectionError,
+        ))
+
+    def delay(self, attempt, exc=None):
+        """Seconds to wait before retry number ``attempt + 1``."""
+        delay = random.uniform(0, min(self.MAX_DELAY, self.BASE_DELAY * 2 ** attempt))
+        response = getattr(exc, "response", None)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(int(retry_after), self.MAX_DELAY))
+        return delay
+
+    def check(self, url):
+        """Fail fast if the url's host is switched off by the breaker."""
+        if self.breaker is not None:
+            self.breaker.check(urlsplit(url).netloc)
+
+    def call(self, url, func, on_retry=None):
+        """Call ``func()`` for a request to ``url``, retrying transient failures.
+
+        ``on_retry(exc, attempt, delay)`` is called before each retry. The
+        last exception is re-raised once the retries are used up.
+        """
+        host = urlsplit(url).netloc
+        attempt = 0
+        last = None
+        while True:
+            if self.breaker is not None:
+                try:
+                    self.breaker.check(host)
+                except HostUnavailable:
+                    # Opened by our own failures: report what actually went wrong
+                    if last is not None:
+                        raise last from None
+                    raise
+            try:
+                result = func()
+            except Exception as e:
+                transient = self.is_transient(e)
+                if self.breaker is not None and not isinstance(e, HostUnavailable):
+                    self.breaker.record(host, ok=not transient)
+                if not transient or attempt >= self.retries:
+                    raise
+                last = e
+                delay = self.delay(attempt, e)
+                attempt += 1
+                if on_retry is not None:
+                    on_retry(e, attempt, delay)
+                time.sleep(delay)
+                continue
+            if self.breaker is not None:
+                self.breaker.record(host, ok=True)
+            return result
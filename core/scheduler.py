@@ -0,0 +1,107 @@
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, CancelledError, wait
+
+
+class DownloadScheduler:
+    """Runs package downloads through a bounded pool of concurrent transfers.
+
+    ``download`` is called once per package from a pool thread and returns the
+    number of bytes saved (or None). Completed-package progress is reported as
+    a percentage through ``progress``. When a ``limiter`` is given, queued
+    packages it marks as high priority start before the others, including
+    packages promoted while the batch is running.
+
+    A failed download does not stop the batch: the package and its exception
+    are appended to ``failures`` and passed to ``on_failure``. ``on_cancel``
+    is called when the batch is cancelled so running downloads can stop.
+    """
+
+    ORDERS = ("input", "smallest", "largest")
+
+    def __init__(self, download, max_concurrent=3, order="input", progress=None,
+                 limiter=None, on_failure=None, on_cancel=None):
+        if order not in self.ORDERS:
+            raise ValueError(f"Unknown queue order: {order}")
+        self.download = download
+        self.max_concurrent = max(1, max_concurrent)
+        self.order = order
+        self.progress = progress or (lambda percent: None)
+        self.limiter = limiter
+        self.on_failure = on_failure or (lambda pkg, exc: None)
+        self.on_cancel = on_cancel or (lambda: None)
+        self.failures = []
+        self._priority_version = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Stop starting new transfers and ask running ones to stop."""
+        self._cancelled.set()
+        self.on_cancel()
+
+    def ordered(self, packages):
+        """Return the packages in the order they should be queued."""
+        if self.order == "smallest":
+            return sorted(packages, key=lambda pkg: pkg.size)
+        if self.order == "largest":
+            return sorted(packages, key=lambda pkg: pkg.size, reverse=True)
+        return list(packages)
+
+    def _next(self, pending):
+        """Pop the next package, re-sorting the queue if priorities changed."""
+        if self.limiter is not None and self.limiter.priority_version != self._priority_version:
+            self._priority_version = self.limiter.priority_version
+            queued = sorted(pending, key=lambda pkg: self.limiter.priority(pkg.url))
+            pending.clear()
+            pending.extend(queued)
+        return pending.popleft()
+
+    def run(self, packages):
+        """Download all packages and return the total number of bytes saved.
+
+        Failed packages are collected in ``failures`` and count as done for
+        the progress. Cancelling raises CancelledError once the running
+        transfers have stopped; a new run starts uncancelled. Any other
+        exception, e.g. KeyboardInterrupt, cancels the batch the same way.
+        """
+        self._cancelled.clear()
+        pending = deque(self.ordered(packages))
+        total = len(pending)
+        if not total:
+            return 0
+
+        self._priority_version = None
+        self.failures = []
+        done = 0
+        downloaded_size = 0
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrent, total)) as pool:
+            running = {}
+            try:
+                while pending or running:
+                    # Packages are handed to the pool one at a time so a
+                    # promoted package can still overtake the queue
+                    while pending and len(running) < self.max_concurrent:
+                        if self._cancelled.is_set():
+                            raise CancelledError()
+                        pkg = self._next(pending)
+                        running[pool.submit(self.download, pkg)] = pkg
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        pkg = running.pop(future)
+                        try:
+                            size = future.result()
+                        except Exception as e:
+                            self.failures.append((pkg, e))
+                            self.on_failure(pkg, e)
+                            size = None
+                        if size:
+                            downloaded_size += size
+                        done += 1
+                        self.progress(int(done / total * 100))
+            except BaseException:
+                self.cancel()
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        return downloaded_size
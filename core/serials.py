@@ -0,0 +1,73 @@
+import re
+
+# A serial is a letter prefix followed by a number, e.g. NPUA80490
+SERIAL_PATTERN = re.compile(r"([A-Z]+)(\d+)")
+
+# "NPUA80000-NPUA80999"; an en dash or "..", and a bare end number, also work
+RANGE_PATTERN = re.compile(r"([A-Z]+\d+)\s*(?:-|–|\.\.)\s*([A-Z]*\d+)")
+
+# Several serials may share a line
+SEPARATOR_PATTERN = re.compile(r"[,;\t]")
+
+
+def iter_serial_range(start, end):
+    """Yield every serial from ``start`` to ``end`` inclusive.
+
+    Both ends must share the letter prefix; the number keeps the width of
+    ``start`` (NPUA00998, NPUA00999, ...). An end without a prefix takes the
+    prefix of ``start``.
+    """
+    first = SERIAL_PATTERN.fullmatch(start)
+    last = SERIAL_PATTERN.fullmatch(end) or re.fullmatch(r"()(\d+)", end)
+    if first is None or last is None:
+        raise ValueError(f"Invalid serial range: {start}-{end}")
+    prefix, digits = first.groups()
+    if last.group(1) not in ("", prefix):
+        raise ValueError(f"Serial range must keep the prefix {prefix}: {start}-{end}")
+    width = len(digits)
+    for number in range(int(digits), int(last.group(2)) + 1):
+        yield f"{prefix}{number:0{width}d}"
+
+
+def parse_range(text):
+    """Return ``(start, end)`` if ``text`` is a serial range, else None."""
+    m = RANGE_PATTERN.fullmatch(text.strip().upper())
+    return m.groups() if m else None
+
+
+def expand_serials(lines):
+    """Yield the serials of some lines, expanding ranges lazily.
+
+    Serials on one line may be separated by commas, semicolons or tabs, and
+    anything after a ``#`` is a comment.
+    """
+    for line in lines:
+        for item in SEPARATOR_PATTERN.split(line.split("#", 1)[0]):
+            item = item.strip().upper()
+            if not item:
+                continue
+            bounds = parse_range(item)
+            if bounds is not None:
+                yield from iter_serial_range(*bounds)
+            else:
+                yield item
+
+
+def unique_serials(serials):
+    """Yield serials in order, skipping any already seen."""
+    seen = set()
+    for serial in serials:
+        if serial not in seen:
+            seen.add(serial)
+            yield serial
+
+
+def read_id_file(path):
+    """Yield the serials of an ID file lazily, once each.
+
+    The file is read line by line while the serials are consumed, so a list
+    of any length never has to be in memory; a UTF-8 byte order mark is
+    ignored. Opening the file fails on the first serial taken.
+    """
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+        yield from unique_serials(expand_serials(f))
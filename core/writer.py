@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+
+
+class BufferPool:
+    """Reusable bytearrays shared by the transfers of a downloader.
+
+    At most ``limit`` buffers exist at once, which bounds the memory held by
+    reads waiting to be written; ``get`` blocks until one is returned.
+    """
+
+    def __init__(self, limit=16):
+        self.limit = max(1, limit)
+        self._free = []
+        self._allocated = 0
+        self._cond = threading.Condition()
+
+    def get(self, size):
+        """Return a buffer of at least ``size`` bytes."""
+        with self._cond:
+            while not self._free and self._allocated >= self.limit:
+                self._cond.wait()
+            if self._free:
+                buf = self._free.pop()
+                if len(buf) >= size:
+                    return buf
+            else:
+                self._allocated += 1
+        # Allocate outside the lock; a too-small free buffer is replaced
+        return bytearray(size)
+
+    def put(self, buf):
+        """Hand a buffer back for reuse."""
+        with self._cond:
+            self._free.append(buf)
+            self._cond.notify()
+
+
+class ChunkWriter(threading.Thread):
+    """Writes filled buffers to an unbuffered file on a dedicated thread.
+
+    The reader queues ``(buffer, length)`` pairs and goes straight back to
+    the network while the disk catches up; at most ``depth`` buffers wait
+    in the queue. ``on_written`` is called with a memoryview of each chunk
+    after it has been written, and every buffer goes back to ``pool``.
+    ``write_time`` is the number of seconds spent in the file's writes.
+    """
+
+    def __init__(self, f, pool, on_written=None, depth=4):
+        super().__init__(daemon=True)
+        self.f = f
+        self.pool = pool
+        self.on_written = on_written or (lambda view: None)
+        self.error = None
+        self.write_time = 0.0
+        self._queue = queue.Queue(maxsize=max(1, depth))
+
+    def write(self, buf, length):
+        """Queue a chunk; raises if an earlier write failed."""
+        self.check()
+        self._queue.put((buf, length))
+
+    def close(self):
+        """Write everything still queued and stop the thread."""
+        self._queue.put(None)
+        self.join()
+
+    def check(self):
+        """Re-raise the first write error, if any."""
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            buf, length = item
+            try:
+                if self.error is None:
+                    with memoryview(buf)[:length] as view:
+                        started = time.perf_counter()
+                        written = 0
+                        while written < length:
+                            # Unbuffered files may accept only part of a write
+                            written += self.f.write(view[written:])
+                        self.write_time += time.perf_counter() - started
+                        self.on_written(view)
+            except BaseException as e:
+                # Keep draining so the reader never blocks on a full queue
+                self.error = e
+            finally:
+                self.pool.put(buf)
@@ -1,31 +1,46 @@
 
+import itertools
+import multiprocessing
 import sys
 
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLineEdit, QLabel, QTableWidget,
-    QTableWidgetItem, QMessageBox, QProgressBar, QTextEdit
+    QPushButton, QLineEdit, QLabel, QTableView,
+    QHeaderView, QMessageBox, QProgressBar, QTextEdit, QSpinBox, QFileDialog
 )
-from PyQt5.QtCore import Qt, QThread
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 
-from ui import DownloadThread, FetchThread, ConfigDialog
+# Only lightweight modules are imported here. The worker modules, which
+# pull in requests and core.batch, are imported on first use, and
+# config.json is read after the window is first painted
 from config import Config
+from core.progress import format_bytes, format_duration
+from core.ratelimit import BandwidthLimiter
+from ui.PackageTableModel import PackageTableModel, PackageFilterProxyModel
+from ui.LogView import LogView
 
 ver = "0.9.3"
 
 class PKGFetcher(QWidget):
+    # Emitted with the new Settings; may come from a worker thread
+    settings_changed = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle(f"PKG Fetcher - {ver}")
         self.setMinimumSize(900, 520)
-        self.packages = []
-        self.downloaded_packages = []
+        self.model = PackageTableModel(self)
+        self.downloaded_keys = set()
         self.thread = None
         self.worker = None
         self.dl_thread = None
         self.dl_worker = None
+        self.audit_thread = None
+        self.audit_worker = None
+        self._painted = False
         self._build_ui()
-        self._check_server_configuration()
+        self.settings_changed.connect(self._apply_settings)
+        Config.subscribe(self.settings_changed.emit)
 
     def _build_ui(self):
         layout = QVBoxLayout()
@@ -36,29 +51,57 @@ class PKGFetcher(QWidget):
         self.serial_input.returnPressed.connect(self.fetch_packages)
         self.fetch_btn = QPushButton("Search")
         self.fetch_btn.clicked.connect(self.fetch_packages)
+        self.catalog_btn = QPushButton("Search catalog")
+        self.catalog_btn.setToolTip(
+            "Look up a title, serial or version in the local catalog of fetched manifests, offline"
+        )
+        self.catalog_btn.clicked.connect(self.search_catalog)
         self.settings_btn = QPushButton("⚙ Settings")
         self.settings_btn.clicked.connect(self.open_settings)
 
         top.addWidget(QLabel("Serial:"))
         top.addWidget(self.serial_input)
         top.addWidget(self.fetch_btn)
+        top.addWidget(self.catalog_btn)
         top.addWidget(self.settings_btn)
 
         # ID List input section
         id_list_layout = QHBoxLayout()
         self.id_list_input = QTextEdit()
-        self.id_list_input.setPlaceholderText("Enter IDs (one per line)\nE.g. NPUA80490\n      NPUA80491\n      NPUA80492")
+        self.id_list_input.setPlaceholderText("Enter IDs or ranges (one per line)\nE.g. NPUA80490\n      NPUA80000-NPUA80999")
         self.id_list_input.setMaximumHeight(80)
         self.fetch_list_btn = QPushButton("Fetch All IDs")
         self.fetch_list_btn.clicked.connect(self.fetch_packages_from_list)
+        self.load_file_btn = QPushButton("Load file…")
+        self.load_file_btn.setToolTip(
+            "Fetch the IDs or ranges in a text file; it is read while fetching,\n"
+            "so lists of any length work and results appear as they arrive"
+        )
+        self.load_file_btn.clicked.connect(self.fetch_packages_from_file)
         id_list_layout.addWidget(QLabel("ID List:"))
         id_list_layout.addWidget(self.id_list_input, 1)
-        id_list_layout.addWidget(self.fetch_list_btn)
-
-        self.table = QTableWidget(0, 5)
-        self.table.setHorizontalHeaderLabels(
-            ["Select", "Title", "Tag", "Version", "Size (MB)"]
-        )
+        fetch_list_buttons = QVBoxLayout()
+        fetch_list_buttons.addWidget(self.fetch_list_btn)
+        fetch_list_buttons.addWidget(self.load_file_btn)
+        id_list_layout.addLayout(fetch_list_buttons)
+
+        filter_layout = QHBoxLayout()
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Title, tag or version")
+        self.filter_input.setClearButtonEnabled(True)
+        filter_layout.addWidget(QLabel("Filter:"))
+        filter_layout.addWidget(self.filter_input)
+
+        self.proxy = PackageFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.filter_input.textChanged.connect(self.proxy.set_filter_text)
+
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        # Keep fetch order until the user clicks a column header
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.table.horizontalHeader().setStretchLastSection(True)
 
         bottom = QHBoxLayout()
@@ -66,31 +109,80 @@ class PKGFetcher(QWidget):
         self.download_btn.clicked.connect(self.download_selected)
         self.remove_btn = QPushButton("Remove selected")
         self.remove_btn.clicked.connect(self.remove_selected)
+        self.prioritize_btn = QPushButton("Prioritize selected")
+        self.prioritize_btn.setToolTip("Download the checked packages ahead of the rest of the queue")
+        self.prioritize_btn.clicked.connect(self.prioritize_selected)
+        self.audit_btn = QPushButton("Audit library")
+        self.audit_btn.setToolTip(
+            "Check the output directory against the catalog for missing, truncated,\n"
+            "corrupt and orphaned files. Unchanged files are not hashed again;\n"
+            "hold Shift to re-hash everything."
+        )
+        self.audit_btn.clicked.connect(self.audit_library)
+        self.rate_spin = QSpinBox()
+        self.rate_spin.setRange(0, 1000000)
+        self.rate_spin.setSingleStep(100)
+        self.rate_spin.setSuffix(" KB/s")
+        self.rate_spin.setSpecialValueText("Unlimited")
+        self.rate_spin.setKeyboardTracking(False)
+        self.rate_spin.setToolTip("Bandwidth limit shared by all downloads")
+        self.rate_spin.valueChanged.connect(self._set_rate_limit)
         self.progress = QProgressBar()
+        self.transfer_label = QLabel()
 
         bottom.addWidget(self.download_btn)
         bottom.addWidget(self.remove_btn)
+        bottom.addWidget(self.prioritize_btn)
+        bottom.addWidget(self.audit_btn)
+        bottom.addWidget(QLabel("Limit:"))
+        bottom.addWidget(self.rate_spin)
         bottom.addWidget(self.progress)
+        bottom.addWidget(self.transfer_label)
 
-        self.log = QTextEdit()
-        self.log.setReadOnly(True)
+        self.log = LogView()
 
         layout.addLayout(top)
         layout.addLayout(id_list_layout)
+        layout.addLayout(filter_layout)
         layout.addWidget(self.table)
         layout.addLayout(bottom)
         layout.addWidget(QLabel("Log:"))
         layout.addWidget(self.log)
         self.setLayout(layout)
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._painted:
+            # Defer loading settings until the window is on screen
+            self._painted = True
+            QTimer.singleShot(0, self._load_settings)
+
+    def _load_settings(self):
+        """Apply settings that affect the window, then check the server URL."""
+        settings = Config.current()
+        self._apply_settings(settings)
+        self._check_server_configuration(settings)
+
+    def _apply_settings(self, settings):
+        self.log.set_max_lines(settings.log_max_lines)
+        BandwidthLimiter.shared().set_limits(settings.rate_limit, settings.host_rate_limits)
+        self.rate_spin.blockSignals(True)
+        self.rate_spin.setValue(settings.rate_limit // 1024)
+        self.rate_spin.blockSignals(False)
+
+    def _set_rate_limit(self, kbps):
+        """Apply a new bandwidth limit to running downloads and remember it."""
+        rate = kbps * 1024
+        BandwidthLimiter.shared().set_rate(rate)
+        config = Config.load()
+        config["download"]["rate_limit"] = rate
+        Config.save(config)
+
     # ===================== FETCH =====================
 
-    def _check_server_configuration(self):
+    def _check_server_configuration(self, config=None):
         """Check if server URL is configured and show warning if not."""
-        config = Config.load()
-        xml_url = Config.get_xml_url(config)
-        
-        if not xml_url or xml_url.strip() == "" or "{add server url}" in xml_url.lower():
+        if not Config.is_server_configured(config):
             QMessageBox.warning(
                 self,
                 "Server Not Configured",
@@ -130,36 +222,15 @@ class PKGFetcher(QWidget):
 
     def open_settings(self):
         """Open the settings dialog."""
+        from ui import ConfigDialog
         dialog = ConfigDialog.ConfigDialog(self)
         dialog.exec_()
 
-    DownloadThread.DownloadWorker
-
     def fetch_packages(self):
         serial = self.serial_input.text().strip().upper()
         if not serial:
             return
-
-        # Clean up any previous fetch thread and worker
-        self._cleanup_thread(self.thread, self.worker)
-
-        self.fetch_btn.setEnabled(False)
-        self.log.clear()
-
-        self.thread = QThread()
-        self.worker = FetchThread.FetchWorker(serial)
-        self.worker.moveToThread(self.thread)
-
-        self.thread.started.connect(self.worker.run)
-        self.worker.finished.connect(self.on_fetch_finished)
-        self.worker.log.connect(self.log.append)
-        self.worker.error.connect(self.on_error)
-
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
-
-        self.thread.start()
+        self._start_fetch(serial)
 
     def fetch_packages_from_list(self):
         """Fetch packages for multiple IDs from the list."""
@@ -168,29 +239,61 @@ class PKGFetcher(QWidget):
             QMessageBox.warning(self, "Warning", "Please enter at least one ID.")
             return
 
-        # Parse IDs from the text area (one per line, trimmed and uppercased)
-        ids = [line.strip().upper() for line in id_list_text.split('\n') if line.strip()]
-        
-        if not ids:
-            QMessageBox.warning(self, "Warning", "Please enter valid IDs.")
+        # IDs are taken one per line, with ranges expanded as they are fetched
+        from core.serials import expand_serials, unique_serials
+        serials = unique_serials(expand_serials(id_list_text.split('\n')))
+        self._start_fetch_list(serials, "Please enter valid IDs.")
+
+    def fetch_packages_from_file(self):
+        """Fetch packages for the IDs in a text file, read while fetching."""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Load ID File", "", "Text files (*.txt *.csv);;All files (*)"
+        )
+        if not path:
             return
 
+        from core.serials import read_id_file
+        if self._start_fetch_list(read_id_file(path), "No IDs found in the file."):
+            self.log.append(f"Reading IDs from {path}")
+
+    def _start_fetch_list(self, serials, empty_message):
+        """Fetch a lazy stream of serials into an emptied table.
+
+        The first serial is taken here so that an unreadable file, a bad
+        leading range or an empty list is reported before anything starts.
+        """
+        try:
+            first = next(serials, None)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Warning", str(e))
+            return False
+        if first is None:
+            QMessageBox.warning(self, "Warning", empty_message)
+            return False
+
+        self.model.clear()  # Clear previous packages
+        self._start_fetch(itertools.chain([first], serials))
+        return True
+
+    def _start_fetch(self, serials):
+        """Run a FetchWorker; its packages are added to the table batch by batch."""
         # Clean up any previous fetch thread and worker
         self._cleanup_thread(self.thread, self.worker)
 
-        self.fetch_list_btn.setEnabled(False)
         self.fetch_btn.setEnabled(False)
+        self.fetch_list_btn.setEnabled(False)
+        self.load_file_btn.setEnabled(False)
         self.log.clear()
-        self.packages = []  # Clear previous packages
-        self.populate_table()
 
+        from ui import FetchThread
         self.thread = QThread()
-        self.worker = FetchThread.FetchWorker(ids)
+        self.worker = FetchThread.FetchWorker(serials)
         self.worker.moveToThread(self.thread)
 
         self.thread.started.connect(self.worker.run)
+        self.worker.packages.connect(self.on_packages_fetched)
         self.worker.finished.connect(self.on_fetch_finished)
-        self.worker.log.connect(self.log.append)
+        self.worker.log.connect(self.log.append_lines)
         self.worker.error.connect(self.on_error)
 
         self.worker.finished.connect(self.thread.quit)
@@ -199,21 +302,31 @@ class PKGFetcher(QWidget):
 
         self.thread.start()
 
-    def on_fetch_finished(self, packages):
+    def search_catalog(self):
+        """Add catalogued packages matching the search text, without going online."""
+        from core.batch import search_catalog
+        try:
+            packages = search_catalog(self.serial_input.text().strip(), Config.current())
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+        added = self.model.add_packages(packages)
+        self.log.append(f"{len(packages)} package(s) found in the catalog, {added} added.")
+
+    def on_packages_fetched(self, packages):
+        # Rows can be checked and downloaded while the rest is still fetching
+        self.model.add_packages(packages)
+
+    def on_fetch_finished(self, total):
         self.fetch_btn.setEnabled(True)
         self.fetch_list_btn.setEnabled(True)
-        self.packages.extend(packages)
-        self.populate_table()
-        self.log.append(f"{len(packages)} package(s) found.")
+        self.load_file_btn.setEnabled(True)
+        self.log.append(f"{total} package(s) found.")
 
     # ===================== DOWNLOAD =====================
 
     def download_selected(self):
-        selected = [
-            self.packages[i]
-            for i in range(self.table.rowCount())
-            if self.table.item(i, 0).checkState() == Qt.Checked
-        ]
+        selected = self.model.checked_packages()
 
         if not selected:
             return
@@ -222,18 +335,21 @@ class PKGFetcher(QWidget):
         self._cleanup_thread(self.dl_thread, self.dl_worker)
 
         # Store the packages being downloaded to remove them later
-        self.downloaded_packages = selected
+        self.downloaded_keys = {PackageTableModel.key(pkg) for pkg in selected}
 
         self.progress.setValue(0)
+        self.transfer_label.clear()
         self.download_btn.setEnabled(False)
 
+        from ui import DownloadThread
         self.dl_thread = QThread()
         self.dl_worker = DownloadThread.DownloadWorker(selected)
         self.dl_worker.moveToThread(self.dl_thread)
 
         self.dl_thread.started.connect(self.dl_worker.run)
         self.dl_worker.progress.connect(self.progress.setValue)
-        self.dl_worker.log.connect(self.log.append)
+        self.dl_worker.transfer.connect(self.on_transfer_progress)
+        self.dl_worker.log.connect(self.log.append_lines)
         self.dl_worker.finished.connect(self.on_download_finished)
         self.dl_worker.error.connect(self.on_error)
 
@@ -243,61 +359,120 @@ class PKGFetcher(QWidget):
 
         self.dl_thread.start()
 
-    def on_download_finished(self):
+    def on_transfer_progress(self, snapshot):
+        """Show overall throughput/ETA and per-package progress."""
+        self.transfer_label.setText(
+            f"{format_bytes(snapshot['done'])} / {format_bytes(snapshot['total'])}"
+            f"  {format_bytes(snapshot['speed'])}/s"
+            f" (avg {format_bytes(snapshot['average'])}/s)"
+            f"  ETA {format_duration(snapshot['eta'])}"
+        )
+
+        for url, item in snapshot["items"].items():
+            if item["finished"]:
+                text = "✓"
+            elif item["size"]:
+                text = f"{item['done'] / item['size'] * 100:.0f}%"
+            else:
+                text = format_bytes(item["done"])
+            self.model.set_progress(url, text)
+
+    def on_download_finished(self, failed):
         self.download_btn.setEnabled(True)
         
-        # Remove downloaded packages from the list
-        for pkg in self.downloaded_packages:
-            if pkg in self.packages:
-                self.packages.remove(pkg)
-        
-        self.populate_table()
-        QMessageBox.information(self, "Completed", "Downloads completed.")
+        # Remove downloaded packages from the list, keep the failed ones
+        self.model.remove_keys(self.downloaded_keys - set(failed))
+        self.downloaded_keys = set()
+        for key in failed:
+            self.model.set_progress(key, "✗ Failed")
+        if failed:
+            QMessageBox.warning(
+                self, "Completed",
+                f"Downloads completed; {len(failed)} package(s) failed. See the log for details."
+            )
+        else:
+            QMessageBox.information(self, "Completed", "Downloads completed.")
 
     def remove_selected(self):
         """Remove selected games from the list."""
-        # Collect indices of checked rows (in reverse to avoid index shifting)
-        checked_rows = []
-        for i in range(self.table.rowCount()):
-            if self.table.item(i, 0).checkState() == Qt.Checked:
-                checked_rows.append(i)
+        checked = self.model.checked_keys()
         
-        if not checked_rows:
+        if not checked:
             QMessageBox.warning(self, "Warning", "Please select games to remove.")
             return
         
-        # Remove in reverse order to avoid index shifting
-        for row in sorted(checked_rows, reverse=True):
-            self.packages.pop(row)
-        
-        self.populate_table()
-        self.log.append(f"Removed {len(checked_rows)} game(s).")
+        removed = self.model.remove_keys(checked)
+        self.log.append(f"Removed {removed} game(s).")
 
-    # ===================== HELPERS =====================
+    def prioritize_selected(self):
+        """Move the checked packages ahead of the download queue."""
+        checked = self.model.checked_keys()
 
-    def populate_table(self):
-        self.table.setRowCount(len(self.packages))
-        for row, pkg in enumerate(self.packages):
-            check = QTableWidgetItem()
-            check.setCheckState(Qt.Unchecked)
-            self.table.setItem(row, 0, check)
-            self.table.setItem(row, 1, QTableWidgetItem(pkg["title"]))
-            self.table.setItem(row, 2, QTableWidgetItem(pkg["tag"]))
-            self.table.setItem(row, 3, QTableWidgetItem(pkg["version"]))
-            self.table.setItem(
-                row, 4,
-                QTableWidgetItem(f"{pkg['size']/1024/1024:.2f}")
-            )
+        if not checked:
+            QMessageBox.warning(self, "Warning", "Please select packages to prioritize.")
+            return
+
+        limiter = BandwidthLimiter.shared()
+        for key in checked:
+            limiter.set_priority(key, BandwidthLimiter.HIGH)
+        self.log.append(f"Prioritized {len(checked)} package(s).")
+
+    # ===================== AUDIT =====================
+
+    def audit_library(self):
+        """Check the downloaded files in a background thread."""
+        incremental = not (QApplication.keyboardModifiers() & Qt.ShiftModifier)
+
+        self._cleanup_thread(self.audit_thread, self.audit_worker)
+        self.audit_btn.setEnabled(False)
+        self.progress.setValue(0)
+
+        from ui import AuditThread
+        self.audit_thread = QThread()
+        self.audit_worker = AuditThread.AuditWorker(incremental)
+        self.audit_worker.moveToThread(self.audit_thread)
+
+        self.audit_thread.started.connect(self.audit_worker.run)
+        self.audit_worker.progress.connect(self.progress.setValue)
+        self.audit_worker.log.connect(self.log.append_lines)
+        self.audit_worker.finished.connect(self.on_audit_finished)
+        self.audit_worker.error.connect(self.on_error)
+
+        self.audit_worker.finished.connect(self.audit_thread.quit)
+        self.audit_worker.finished.connect(self.audit_worker.deleteLater)
+        self.audit_thread.finished.connect(self.audit_thread.deleteLater)
+
+        self.audit_thread.start()
+
+    def on_audit_finished(self, report):
+        """List the packages that need downloading again."""
+        self.audit_btn.setEnabled(True)
+        self.progress.setValue(100)
+        self.model.add_packages(report.problems)
+        for label, packages in (("Missing", report.missing), ("Truncated", report.truncated),
+                                ("Corrupt", report.corrupt)):
+            for pkg in packages:
+                self.model.set_progress(PackageTableModel.key(pkg), label)
+        text = f"Audit finished: {report.summary()}."
+        if report.problems:
+            text += f"\n\n{len(report.problems)} package(s) were added to the list for downloading."
+        QMessageBox.information(self, "Audit", text)
+
+    # ===================== HELPERS =====================
 
     def on_error(self, msg):
         self.fetch_btn.setEnabled(True)
         self.fetch_list_btn.setEnabled(True)
+        self.load_file_btn.setEnabled(True)
         self.download_btn.setEnabled(True)
+        self.audit_btn.setEnabled(True)
         QMessageBox.critical(self, "Error", msg)
 
 # ===================== MAIN =====================
 
 if __name__ == "__main__":
+    # The library audit hashes in worker processes, also from a frozen build
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     win = PKGFetcher()
     win.show()
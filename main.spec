@@ -2,9 +2,15 @@
 """
 PyInstaller spec file for PKG Fetcher
 Build command: pyinstaller main.spec
+
+Set PKG_FETCHER_ONEDIR=1 to build a folder instead of a single executable.
+The one-file build unpacks itself to a temporary directory on every launch,
+which makes startup noticeably slower.
 """
+import os
 
 block_cipher = None
+onedir = os.environ.get("PKG_FETCHER_ONEDIR") == "1"
 
 a = Analysis(
     ['main.py'],
@@ -17,6 +23,30 @@ a = Analysis(
         'PyQt5.QtWidgets',
         'ui.DownloadThread',
         'ui.FetchThread',
+        'ui.AuditThread',
+        'ui.ConfigDialog',
+        'ui.PackageTableModel',
+        'ui.LogView',
+        'core.batch',
+        'core.audit',
+        'core.http_client',
+        'core.package',
+        'core.serials',
+        'core.catalog',
+        'core.manifest',
+        'core.manifest_cache',
+        'core.fetcher',
+        'core.downloader',
+        'core.journal',
+        'core.library',
+        'core.logbuffer',
+        'core.metrics',
+        'core.progress',
+        'core.ratelimit',
+        'core.retry',
+        'core.scheduler',
+        'core.writer',
+        'core.chunktuner',
     ],
     hookspath=[],
     hooksconfig={},
@@ -33,10 +63,9 @@ pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.zipfiles,
-    a.datas,
+    *([] if onedir else [a.binaries, a.zipfiles, a.datas]),
     [],
+    exclude_binaries=onedir,
     name='PKG_Fetcher',
     debug=False,
     bootloader_ignore_signals=False,
@@ -51,3 +80,15 @@ exe = EXE(
     entitlements_file=None,
     icon='icon.ico',
 )
+
+if onedir:
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.zipfiles,
+        a.datas,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        name='PKG_Fetcher',
+    )
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from core.catalog import Catalog
+from core.manifest import parse_manifest
+
+MANIFEST = b"""<?xml version="1.0" encoding="utf-8"?>
+<titlepatch titleid="BCUS00001">
+  <tag name="T01">
+    <package version="01.01" size="100" sha1sum="aa" url="http://host/a.pkg">
+      <paramsfo><TITLE>Some Game</TITLE></paramsfo>
+    </package>
+    <package version="01.02" size="200" sha1sum="bb" url="http://host/b.pkg"/>
+  </tag>
+</titlepatch>
+"""
+
+
+class CatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.logged = []
+        self.catalog = Catalog(os.path.join(self.directory.name, "catalog.db"),
+                               log=self.logged.append)
+
+    def tearDown(self):
+        self.catalog.close()
+        self.directory.cleanup()
+
+    def test_package_without_title_is_recorded(self):
+        packages = parse_manifest(MANIFEST, "BCUS00001")
+        self.assertIsNone(packages[1].title)
+
+        self.catalog.record("BCUS00001", packages)
+
+        self.assertEqual(self.logged, [])
+        self.assertEqual(self.catalog.stats(), (1, 1, 2))
+        self.assertEqual(self.catalog.packages_for("BCUS00001"), packages)
+        self.assertEqual([pkg.url for pkg in self.catalog.search("01.02")],
+                         ["http://host/b.pkg"])
+
+    def test_save_error_is_logged(self):
+        self.catalog.record("BCUS00001", parse_manifest(MANIFEST, "BCUS00001"))
+        self.catalog._db.execute("DROP TABLE serials")
+
+        self.catalog.record("BCUS00001", [])
+
+        self.assertEqual(len(self.logged), 1)
+        self.assertIn("BCUS00001", self.logged[0])
+        # The failed replace rolled back, so the last manifest is kept
+        self.assertEqual(len(self.catalog.packages_for("BCUS00001")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
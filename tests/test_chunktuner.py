@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from core.chunktuner import ChunkSizer, ChunkTuner
+
+KB = 1024
+MB = 1024 * 1024
+
+
+class ChunkSizerTest(unittest.TestCase):
+    def setUp(self):
+        self.tuner = ChunkTuner()
+        self.sizer = self.tuner.stream("host")
+
+    def read(self, rate, count=1):
+        """Record ``count`` reads of the current size at ``rate`` bytes per second."""
+        for _ in range(count):
+            self.sizer.record(self.sizer.size, self.sizer.size / rate)
+
+    def test_buffer_hit_leaves_size_alone(self):
+        self.read(1 * MB, count=3)
+        size = self.sizer.size
+
+        self.sizer.record(size, 0.0)
+        self.sizer.record(size, ChunkSizer.MIN_TIME / 10)
+
+        self.assertEqual(self.sizer.size, size)
+
+    def test_slow_host_stays_small_after_buffer_hits(self):
+        # A 1 MB/s host whose socket buffer serves every other read instantly
+        for _ in range(20):
+            self.sizer.record(self.sizer.size, 0.0)
+            self.read(1 * MB)
+            self.assertLessEqual(self.sizer.size, 128 * KB)
+        self.assertEqual(self.sizer.size, 64 * KB)
+
+    def test_growth_is_capped_per_read(self):
+        size = self.sizer.size
+        self.read(100 * MB)
+        self.assertEqual(self.sizer.size, size * 2)
+        self.read(100 * MB, count=10)
+        self.assertEqual(self.sizer.size, ChunkTuner.MAX_SIZE)
+
+    def test_learns_from_measured_reads(self):
+        self.read(1 * MB, count=ChunkSizer.MIN_READS)
+        self.sizer.finish()
+        self.assertEqual(self.tuner.sizes, {"host": 64 * KB})
+
+    def test_mostly_buffer_hits_are_not_learned(self):
+        self.read(1 * MB, count=ChunkSizer.MIN_READS)
+        for _ in range(ChunkSizer.MIN_READS + 1):
+            self.sizer.record(self.sizer.size, 0.0)
+        self.sizer.finish()
+        self.assertEqual(self.tuner.sizes, {})
+
+    def test_too_few_reads_are_not_learned(self):
+        self.read(1 * MB, count=ChunkSizer.MIN_READS - 1)
+        self.sizer.finish()
+        self.assertEqual(self.tuner.sizes, {})
+
+
+class ChunkTunerTest(unittest.TestCase):
+    def test_clamp(self):
+        self.assertEqual(ChunkTuner.clamp(0), ChunkTuner.MIN_SIZE)
+        self.assertEqual(ChunkTuner.clamp(300 * KB), 256 * KB)
+        self.assertEqual(ChunkTuner.clamp(100 * MB), ChunkTuner.MAX_SIZE)
+
+    def test_sizes_survive_a_session(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "chunk_sizes.json")
+            tuner = ChunkTuner(path)
+            tuner.learn("host", 512 * KB)
+            tuner.save()
+
+            self.assertEqual(ChunkTuner(path).stream("host").size, 512 * KB)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import sys
+from PyQt5.QtCore import QObject, pyqtSignal
+
+# Add parent directory to path to import config
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from core.batch import audit_library, configure_logging
+from core.logbuffer import LogBuffer
+
+class AuditWorker(QObject):
+    progress = pyqtSignal(int)
+    log = pyqtSignal(list)
+    finished = pyqtSignal(object)  # AuditReport
+    error = pyqtSignal(str)
+
+    def __init__(self, incremental=True):
+        super().__init__()
+        self.incremental = incremental
+
+    def run(self):
+        log = LogBuffer(self.log.emit, source="audit")
+        try:
+            settings = Config.current()
+            configure_logging(settings)
+            report = audit_library(
+                settings,
+                log=log.write,
+                incremental=self.incremental,
+                on_progress=self._report_progress
+            )
+            log.flush()
+            self.finished.emit(report)
+
+        except Exception as e:
+            log.flush()
+            self.error.emit(str(e))
+
+    def _report_progress(self, done, total):
+        self.progress.emit(int(done / total * 100) if total else 100)
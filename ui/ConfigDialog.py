@@ -1,6 +1,6 @@
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-    QSpinBox, QCheckBox, QPushButton, QMessageBox
+    QSpinBox, QCheckBox, QPushButton, QMessageBox, QComboBox
 )
 from PyQt5.QtCore import Qt
 
@@ -8,6 +8,7 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config
+from core.manifest_cache import ManifestCache
 
 
 class ConfigDialog(QDialog):
@@ -43,9 +44,36 @@ class ConfigDialog(QDialog):
         self.timeout_spin.setMinimum(5)
         self.timeout_spin.setMaximum(120)
         timeout_layout.addWidget(self.timeout_spin)
+        timeout_layout.addWidget(QLabel("Retries:"))
+        self.retries_spin = QSpinBox()
+        self.retries_spin.setMinimum(0)
+        self.retries_spin.setMaximum(10)
+        self.retries_spin.setToolTip("Retries of timeouts and server errors, with increasing delays")
+        timeout_layout.addWidget(self.retries_spin)
         timeout_layout.addStretch()
         layout.addLayout(timeout_layout)
         
+        # Concurrency
+        workers_layout = QHBoxLayout()
+        workers_layout.addWidget(QLabel("Max Concurrent Requests:"))
+        self.max_workers_spin = QSpinBox()
+        self.max_workers_spin.setMinimum(1)
+        self.max_workers_spin.setMaximum(64)
+        workers_layout.addWidget(self.max_workers_spin)
+        workers_layout.addWidget(QLabel("Per Host:"))
+        self.max_per_host_spin = QSpinBox()
+        self.max_per_host_spin.setMinimum(1)
+        self.max_per_host_spin.setMaximum(32)
+        workers_layout.addWidget(self.max_per_host_spin)
+        workers_layout.addWidget(QLabel("Connection Pool Size:"))
+        self.pool_size_spin = QSpinBox()
+        self.pool_size_spin.setMinimum(1)
+        self.pool_size_spin.setMaximum(64)
+        self.pool_size_spin.setToolTip("Keep-alive connections kept open per host")
+        workers_layout.addWidget(self.pool_size_spin)
+        workers_layout.addStretch()
+        layout.addLayout(workers_layout)
+        
         # SSL Verification
         self.verify_ssl_check = QCheckBox("Verify SSL Certificate")
         layout.addWidget(self.verify_ssl_check)
@@ -66,13 +94,149 @@ class ConfigDialog(QDialog):
         chunk_layout = QHBoxLayout()
         chunk_layout.addWidget(QLabel("Download Chunk Size (bytes):"))
         self.chunk_size_spin = QSpinBox()
-        self.chunk_size_spin.setMinimum(65536)  # 64 KB
+        self.chunk_size_spin.setMinimum(0)
+        self.chunk_size_spin.setSpecialValueText("Auto")
+        self.chunk_size_spin.setToolTip("Auto measures each transfer and remembers the best size per server")
         self.chunk_size_spin.setMaximum(10485760)  # 10 MB
         self.chunk_size_spin.setSingleStep(65536)
         chunk_layout.addWidget(self.chunk_size_spin)
         chunk_layout.addStretch()
         layout.addLayout(chunk_layout)
         
+        # Concurrent Downloads
+        concurrent_layout = QHBoxLayout()
+        concurrent_layout.addWidget(QLabel("Concurrent Downloads:"))
+        self.concurrent_spin = QSpinBox()
+        self.concurrent_spin.setMinimum(1)
+        self.concurrent_spin.setMaximum(16)
+        concurrent_layout.addWidget(self.concurrent_spin)
+        concurrent_layout.addWidget(QLabel("Queue Order:"))
+        self.queue_order_combo = QComboBox()
+        self.queue_order_combo.addItem("As listed", "input")
+        self.queue_order_combo.addItem("Smallest first", "smallest")
+        self.queue_order_combo.addItem("Largest first", "largest")
+        concurrent_layout.addWidget(self.queue_order_combo)
+        concurrent_layout.addWidget(QLabel("Segments per File:"))
+        self.segments_spin = QSpinBox()
+        self.segments_spin.setMinimum(1)
+        self.segments_spin.setMaximum(16)
+        self.segments_spin.setToolTip("Parallel byte-range connections for large files (1 disables)")
+        concurrent_layout.addWidget(self.segments_spin)
+        concurrent_layout.addStretch()
+        layout.addLayout(concurrent_layout)
+        
+        # Bandwidth limit
+        rate_layout = QHBoxLayout()
+        rate_layout.addWidget(QLabel("Bandwidth Limit (KB/s):"))
+        self.rate_limit_spin = QSpinBox()
+        self.rate_limit_spin.setMinimum(0)
+        self.rate_limit_spin.setMaximum(1000000)
+        self.rate_limit_spin.setSingleStep(100)
+        self.rate_limit_spin.setSpecialValueText("Unlimited")
+        self.rate_limit_spin.setToolTip("Shared by all downloads; per-host limits can be set in config.json")
+        rate_layout.addWidget(self.rate_limit_spin)
+        rate_layout.addStretch()
+        layout.addLayout(rate_layout)
+        
+        # Skip existing files
+        self.skip_existing_check = QCheckBox("Skip packages already present in the output directory")
+        layout.addWidget(self.skip_existing_check)
+        self.verify_checksum_check = QCheckBox("Verify SHA-1 checksum while downloading")
+        layout.addWidget(self.verify_checksum_check)
+        self.preallocate_check = QCheckBox("Reserve disk space for each file before downloading")
+        self.preallocate_check.setToolTip("Avoids fragmentation and fails early when the disk is full")
+        layout.addWidget(self.preallocate_check)
+        
+        layout.addSpacing(20)
+        
+        # Cache Settings
+        layout.addWidget(QLabel("<b>Manifest Cache</b>"))
+        
+        self.cache_enabled_check = QCheckBox("Cache fetched manifests on disk")
+        layout.addWidget(self.cache_enabled_check)
+        
+        cache_layout = QHBoxLayout()
+        cache_layout.addWidget(QLabel("Keep (hours):"))
+        self.cache_ttl_spin = QSpinBox()
+        self.cache_ttl_spin.setMinimum(0)
+        self.cache_ttl_spin.setMaximum(24 * 30)
+        self.cache_ttl_spin.setToolTip("0 always revalidates with the server")
+        cache_layout.addWidget(self.cache_ttl_spin)
+        cache_layout.addWidget(QLabel("Missing serials (minutes):"))
+        self.cache_negative_ttl_spin = QSpinBox()
+        self.cache_negative_ttl_spin.setMinimum(0)
+        self.cache_negative_ttl_spin.setMaximum(24 * 60)
+        cache_layout.addWidget(self.cache_negative_ttl_spin)
+        cache_layout.addWidget(QLabel("Max Size (MB):"))
+        self.cache_size_spin = QSpinBox()
+        self.cache_size_spin.setMinimum(1)
+        self.cache_size_spin.setMaximum(4096)
+        cache_layout.addWidget(self.cache_size_spin)
+        self.clear_cache_btn = QPushButton("Clear Cache")
+        self.clear_cache_btn.clicked.connect(self._clear_cache)
+        cache_layout.addWidget(self.clear_cache_btn)
+        cache_layout.addStretch()
+        layout.addLayout(cache_layout)
+        
+        layout.addSpacing(20)
+        
+        # Log Settings
+        layout.addWidget(QLabel("<b>Log</b>"))
+        
+        log_layout = QHBoxLayout()
+        log_layout.addWidget(QLabel("Lines Kept on Screen:"))
+        self.log_lines_spin = QSpinBox()
+        self.log_lines_spin.setMinimum(100)
+        self.log_lines_spin.setMaximum(1000000)
+        self.log_lines_spin.setSingleStep(1000)
+        log_layout.addWidget(self.log_lines_spin)
+        log_layout.addStretch()
+        layout.addLayout(log_layout)
+        
+        log_file_layout = QHBoxLayout()
+        log_file_layout.addWidget(QLabel("Log File:"))
+        self.log_file_input = QLineEdit()
+        self.log_file_input.setPlaceholderText("Leave empty to disable")
+        self.log_file_input.setToolTip("Full log written as JSON lines, rotated by size")
+        log_file_layout.addWidget(self.log_file_input)
+        log_file_layout.addWidget(QLabel("Max Size (MB):"))
+        self.log_file_size_spin = QSpinBox()
+        self.log_file_size_spin.setMinimum(1)
+        self.log_file_size_spin.setMaximum(1024)
+        log_file_layout.addWidget(self.log_file_size_spin)
+        layout.addLayout(log_file_layout)
+        
+        layout.addSpacing(20)
+        
+        # Metrics Settings
+        layout.addWidget(QLabel("<b>Metrics</b>"))
+        
+        report_layout = QHBoxLayout()
+        report_layout.addWidget(QLabel("Timing Report:"))
+        self.metrics_report_input = QLineEdit()
+        self.metrics_report_input.setPlaceholderText("Leave empty to disable")
+        self.metrics_report_input.setToolTip(
+            "Per-request DNS, connect, TLS, first byte, transfer, parse and disk times, "
+            "written after each batch (JSON, or CSV for a .csv file)"
+        )
+        report_layout.addWidget(self.metrics_report_input)
+        report_layout.addWidget(QLabel("Endpoint Port:"))
+        self.metrics_port_spin = QSpinBox()
+        self.metrics_port_spin.setMinimum(0)
+        self.metrics_port_spin.setMaximum(65535)
+        self.metrics_port_spin.setSpecialValueText("Off")
+        self.metrics_port_spin.setToolTip("Serve http://127.0.0.1:<port>/metrics (0 = off)")
+        report_layout.addWidget(self.metrics_port_spin)
+        layout.addLayout(report_layout)
+        
+        profile_layout = QHBoxLayout()
+        profile_layout.addWidget(QLabel("Profile Directory:"))
+        self.metrics_profile_input = QLineEdit()
+        self.metrics_profile_input.setPlaceholderText("Leave empty to disable")
+        self.metrics_profile_input.setToolTip("cProfile dump of the worker threads of each batch")
+        profile_layout.addWidget(self.metrics_profile_input)
+        layout.addLayout(profile_layout)
+        
         layout.addSpacing(20)
         
         # Buttons
@@ -101,9 +265,37 @@ class ConfigDialog(QDialog):
         
         self.xml_url_input.setText(server_config.get("xml_url", ""))
         self.timeout_spin.setValue(server_config.get("timeout", 15))
+        self.retries_spin.setValue(server_config.get("retries", 3))
         self.verify_ssl_check.setChecked(server_config.get("verify_ssl", False))
+        self.max_workers_spin.setValue(server_config.get("max_workers", 8))
+        self.max_per_host_spin.setValue(server_config.get("max_per_host", 4))
+        self.pool_size_spin.setValue(server_config.get("pool_size", 10))
         self.output_dir_input.setText(download_config.get("output_directory", "pkgs"))
-        self.chunk_size_spin.setValue(download_config.get("chunk_size", 1048576))
+        self.chunk_size_spin.setValue(download_config.get("chunk_size", 0))
+        self.concurrent_spin.setValue(download_config.get("concurrent_downloads", 3))
+        order_index = self.queue_order_combo.findData(download_config.get("queue_order", "input"))
+        self.queue_order_combo.setCurrentIndex(max(order_index, 0))
+        self.segments_spin.setValue(download_config.get("segments", 4))
+        self.skip_existing_check.setChecked(download_config.get("skip_existing", True))
+        self.verify_checksum_check.setChecked(download_config.get("verify_checksum", True))
+        self.rate_limit_spin.setValue(download_config.get("rate_limit", 0) // 1024)
+        self.preallocate_check.setChecked(download_config.get("preallocate", False))
+        
+        cache_config = Config.get_cache_settings(self.config)
+        self.cache_enabled_check.setChecked(cache_config["enabled"])
+        self.cache_ttl_spin.setValue(cache_config["ttl"] // 3600)
+        self.cache_negative_ttl_spin.setValue(cache_config["negative_ttl"] // 60)
+        self.cache_size_spin.setValue(cache_config["max_size_mb"])
+        
+        log_config = Config.get_log_settings(self.config)
+        self.log_lines_spin.setValue(log_config["max_lines"])
+        self.log_file_input.setText(log_config["file"])
+        self.log_file_size_spin.setValue(log_config["file_max_mb"])
+        
+        metrics_config = Config.get_metrics_settings(self.config)
+        self.metrics_report_input.setText(metrics_config["report"])
+        self.metrics_port_spin.setValue(metrics_config["port"])
+        self.metrics_profile_input.setText(metrics_config["profile"])
     
     def _save_config(self):
         """Save configuration to file."""
@@ -124,15 +316,46 @@ class ConfigDialog(QDialog):
         # Update config dictionary
         self.config["server"]["xml_url"] = self.xml_url_input.text().strip()
         self.config["server"]["timeout"] = self.timeout_spin.value()
+        self.config["server"]["retries"] = self.retries_spin.value()
         self.config["server"]["verify_ssl"] = self.verify_ssl_check.isChecked()
+        self.config["server"]["max_workers"] = self.max_workers_spin.value()
+        self.config["server"]["max_per_host"] = self.max_per_host_spin.value()
+        self.config["server"]["pool_size"] = self.pool_size_spin.value()
         self.config["download"]["output_directory"] = self.output_dir_input.text().strip()
         self.config["download"]["chunk_size"] = self.chunk_size_spin.value()
+        self.config["download"]["concurrent_downloads"] = self.concurrent_spin.value()
+        self.config["download"]["queue_order"] = self.queue_order_combo.currentData()
+        self.config["download"]["segments"] = self.segments_spin.value()
+        self.config["download"]["skip_existing"] = self.skip_existing_check.isChecked()
+        self.config["download"]["verify_checksum"] = self.verify_checksum_check.isChecked()
+        self.config["download"]["rate_limit"] = self.rate_limit_spin.value() * 1024
+        self.config["download"]["preallocate"] = self.preallocate_check.isChecked()
+        cache_config = self.config.setdefault("cache", Config.get_cache_settings(self.config))
+        cache_config["enabled"] = self.cache_enabled_check.isChecked()
+        cache_config["ttl"] = self.cache_ttl_spin.value() * 3600
+        cache_config["negative_ttl"] = self.cache_negative_ttl_spin.value() * 60
+        cache_config["max_size_mb"] = self.cache_size_spin.value()
+        log_config = self.config.setdefault("log", Config.get_log_settings(self.config))
+        log_config["max_lines"] = self.log_lines_spin.value()
+        log_config["file"] = self.log_file_input.text().strip()
+        log_config["file_max_mb"] = self.log_file_size_spin.value()
+        metrics_config = self.config.setdefault("metrics", Config.get_metrics_settings(self.config))
+        metrics_config["report"] = self.metrics_report_input.text().strip()
+        metrics_config["port"] = self.metrics_port_spin.value()
+        metrics_config["profile"] = self.metrics_profile_input.text().strip()
         
         # Save to file
         Config.save(self.config)
         QMessageBox.information(self, "Success", "Settings saved successfully.")
         self.accept()
     
+    def _clear_cache(self):
+        """Delete all cached manifests."""
+        cache_dir = Config.get_cache_settings(self.config)["directory"]
+        if os.path.isdir(cache_dir):
+            ManifestCache(cache_dir).clear()
+        QMessageBox.information(self, "Success", "Manifest cache cleared.")
+    
     def _reset_to_defaults(self):
         """Reset all settings to defaults."""
         reply = QMessageBox.question(
@@ -1,16 +1,18 @@
 import os
-import requests
 import sys
 from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal
 
 # Add parent directory to path to import config
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config
+from core.batch import configure_logging, download_packages
+from core.logbuffer import LogBuffer
 
 class DownloadWorker(QObject):
     progress = pyqtSignal(int)
-    log = pyqtSignal(str)
-    finished = pyqtSignal()
+    transfer = pyqtSignal(dict)
+    log = pyqtSignal(list)
+    finished = pyqtSignal(list)  # keys of the packages that failed
     error = pyqtSignal(str)
 
     def __init__(self, packages):
@@ -18,42 +20,27 @@ class DownloadWorker(QObject):
         self.packages = packages
 
     def run(self):
+        log = LogBuffer(self.log.emit, source="download")
+        failed = []
         try:
-            config = Config.load()
-            output_dir = Config.get_output_directory(config)
-            chunk_size = Config.get_chunk_size(config)
-            verify_ssl = Config.get_verify_ssl(config)
-            
-            os.makedirs(output_dir, exist_ok=True)
-            total = len(self.packages)
-            downloaded_size = 0
-
-            for idx, pkg in enumerate(self.packages, start=1):
-                self.log.emit(f"Downloading {pkg['title']} ({pkg['version']})")
-
-                filename = os.path.join(
-                    output_dir, pkg["url"].split("/")[-1]
-                )
-
-                with requests.get(pkg["url"], stream=True, verify=verify_ssl) as r:
-                    r.raise_for_status()
-                    with open(filename, "wb") as f:
-                        for chunk in r.iter_content(chunk_size=chunk_size):
-                            if chunk:
-                                f.write(chunk)
-                
-                # Verify file was written
-                if os.path.exists(filename):
-                    file_size = os.path.getsize(filename)
-                    downloaded_size += file_size
-                    self.log.emit(f"✓ Saved: {filename} ({file_size / 1024 / 1024:.2f} MB)")
-                else:
-                    self.log.emit(f"✗ Failed to save: {filename}")
-
-                self.progress.emit(int(idx / total * 100))
-
-            self.log.emit(f"Total downloaded: {downloaded_size / 1024 / 1024:.2f} MB")
-            self.finished.emit()
+            settings = Config.current()
+            configure_logging(settings)
+            downloaded_size = download_packages(
+                self.packages, settings,
+                log=log.write,
+                on_progress=self._report_progress,
+                on_failure=lambda pkg, reason: failed.append(pkg.url)
+            )
+
+            log.write(f"Total downloaded: {downloaded_size / 1024 / 1024:.2f} MB")
+            log.flush()
+            self.finished.emit(failed)
 
         except Exception as e:
-            self.error.emit(str(e))
\ No newline at end of file
+            log.flush()
+            self.error.emit(str(e))
+
+    def _report_progress(self, snapshot):
+        """Forward a rate-limited progress snapshot to the UI."""
+        self.progress.emit(snapshot["percent"])
+        self.transfer.emit(snapshot)
\ No newline at end of file
@@ -0,0 +1,52 @@
+from collections import deque
+
+from PyQt5.QtWidgets import QPlainTextEdit
+from PyQt5.QtCore import QTimer
+
+
+class LogView(QPlainTextEdit):
+    """Read-only log panel that appends queued lines in batches.
+
+    Lines are queued and written to the document together on a timer, so a
+    flood of worker messages costs one relayout per tick instead of one per
+    line. Only the last ``max_lines`` lines are kept.
+    """
+
+    def __init__(self, max_lines=5000, interval=100, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self._pending = deque(maxlen=max_lines)
+        self.set_max_lines(max_lines)
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def set_max_lines(self, max_lines):
+        """Change how many lines of history are kept on screen."""
+        self.setMaximumBlockCount(max_lines)
+        self._pending = deque(self._pending, maxlen=max_lines)
+
+    def append(self, line):
+        """Queue a single line."""
+        self._pending.append(line)
+
+    def append_lines(self, lines):
+        """Queue a batch of lines."""
+        self._pending.extend(lines)
+
+    def flush(self):
+        """Write all queued lines to the document."""
+        if not self._pending:
+            return
+        text = "\n".join(self._pending)
+        self._pending.clear()
+        self.appendPlainText(text)
+
+    def clear(self):
+        self._pending.clear()
+        super().clear()
+
+    def toPlainText(self):
+        self.flush()
+        return super().toPlainText()
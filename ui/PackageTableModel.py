@@ -0,0 +1,249 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+
+
+class PackageTableModel(QAbstractTableModel):
+    """Table model holding the fetched packages.
+
+    Rows are keyed by package URL for O(1) lookups; the checked state and
+    per-package progress live in the model rather than in widget items, so
+    rows can be inserted, removed, sorted and filtered without rebuilding
+    the table. Sorting is done here with a plain list sort instead of in the
+    proxy, which would call back into Python for every comparison.
+    """
+
+    COLUMNS = ["Select", "Title", "Tag", "Version", "Size (MB)", "Progress"]
+    CHECK, TITLE, TAG, VERSION, SIZE, PROGRESS = range(6)
+
+    # Above this many separate row ranges a removal resets the model instead
+    MAX_REMOVE_RUNS = 32
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._packages = []
+        self._rows = {}
+        self._checked = set()
+        self._progress = {}
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+
+    @staticmethod
+    def key(pkg):
+        """Return the key identifying a package row."""
+        return pkg.url
+
+    # ---------- Qt model interface ----------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._packages)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == self.CHECK:
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        pkg = self._packages[index.row()]
+        column = index.column()
+
+        if role == Qt.CheckStateRole and column == self.CHECK:
+            return Qt.Checked if self.key(pkg) in self._checked else Qt.Unchecked
+        if role == Qt.DisplayRole:
+            if column == self.TITLE:
+                return pkg.title
+            if column == self.TAG:
+                return pkg.tag
+            if column == self.VERSION:
+                return pkg.version
+            if column == self.SIZE:
+                return f"{pkg.size/1024/1024:.2f}"
+            if column == self.PROGRESS:
+                return self._progress.get(self.key(pkg), "")
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or index.column() != self.CHECK:
+            return False
+        key = self.key(self._packages[index.row()])
+        if value == Qt.Checked:
+            self._checked.add(key)
+        else:
+            self._checked.discard(key)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        if column < 0:
+            return
+        self._reorder()
+
+    def _sort_key(self, column):
+        if column == self.CHECK:
+            return lambda pkg: self.key(pkg) in self._checked
+        if column == self.SIZE:
+            return lambda pkg: pkg.size
+        if column == self.PROGRESS:
+            return lambda pkg: self._progress.get(self.key(pkg), "")
+        field = {self.TITLE: "title", self.TAG: "tag", self.VERSION: "version"}[column]
+        return lambda pkg: (getattr(pkg, field) or "").lower()
+
+    def _reorder(self):
+        """Re-sort the rows in place, keeping persistent indexes valid."""
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        old_keys = [(self.key(self._packages[i.row()]), i.column()) for i in old_indexes]
+
+        self._packages.sort(
+            key=self._sort_key(self._sort_column),
+            reverse=self._sort_order == Qt.DescendingOrder
+        )
+        self._reindex(0)
+
+        new_indexes = [self.index(self._rows[key], column) for key, column in old_keys]
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def _reindex(self, first):
+        for row in range(first, len(self._packages)):
+            self._rows[self.key(self._packages[row])] = row
+
+    def search_text(self, row):
+        """Return the lower-case title/tag/version text used for filtering."""
+        pkg = self._packages[row]
+        return f"{pkg.title or ''}\n{pkg.tag or ''}\n{pkg.version or ''}".lower()
+
+    # ---------- Package store ----------
+
+    def packages(self):
+        """Return all packages in table order."""
+        return list(self._packages)
+
+    def package(self, key):
+        """Return the package with the given key, or None."""
+        row = self._rows.get(key)
+        return None if row is None else self._packages[row]
+
+    def add_packages(self, packages):
+        """Append packages, skipping ones already in the table.
+
+        Returns the number of rows added.
+        """
+        new = []
+        seen = set()
+        for pkg in packages:
+            key = self.key(pkg)
+            if key in self._rows or key in seen:
+                continue
+            seen.add(key)
+            new.append(pkg)
+        if not new:
+            return 0
+
+        first = len(self._packages)
+        self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+        for row, pkg in enumerate(new, start=first):
+            self._packages.append(pkg)
+            self._rows[self.key(pkg)] = row
+        self.endInsertRows()
+
+        if self._sort_column >= 0:
+            self._reorder()
+        return len(new)
+
+    def remove_keys(self, keys):
+        """Remove the packages with the given keys; returns how many were removed."""
+        rows = sorted({self._rows[key] for key in keys if key in self._rows}, reverse=True)
+        if not rows:
+            return 0
+
+        runs = sum(1 for a, b in zip(rows, rows[1:]) if a - b > 1) + 1
+        if runs > self.MAX_REMOVE_RUNS:
+            # Scattered removals: one reset is cheaper than many row signals
+            self.beginResetModel()
+            removed = {self.key(self._packages[row]) for row in rows}
+            self._packages = [pkg for pkg in self._packages if self.key(pkg) not in removed]
+            for key in removed:
+                del self._rows[key]
+                self._checked.discard(key)
+                self._progress.pop(key, None)
+            self._reindex(0)
+            self.endResetModel()
+            return len(rows)
+
+        # Remove contiguous runs from the bottom up so row numbers stay valid
+        run_end = run_start = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == run_start - 1:
+                run_start = row
+                continue
+            self.beginRemoveRows(QModelIndex(), run_start, run_end)
+            for pkg in self._packages[run_start:run_end + 1]:
+                key = self.key(pkg)
+                del self._rows[key]
+                self._checked.discard(key)
+                self._progress.pop(key, None)
+            del self._packages[run_start:run_end + 1]
+            self.endRemoveRows()
+            if row is not None:
+                run_end = run_start = row
+
+        # Reindex only the rows that moved
+        self._reindex(rows[-1])
+        return len(rows)
+
+    def clear(self):
+        """Remove every package."""
+        self.beginResetModel()
+        self._packages = []
+        self._rows = {}
+        self._checked = set()
+        self._progress = {}
+        self.endResetModel()
+
+    def checked_packages(self):
+        """Return the checked packages in table order."""
+        return [pkg for pkg in self._packages if self.key(pkg) in self._checked]
+
+    def checked_keys(self):
+        return set(self._checked)
+
+    def set_progress(self, key, text):
+        """Update the progress cell of a package."""
+        row = self._rows.get(key)
+        if row is None or self._progress.get(key) == text:
+            return
+        self._progress[key] = text
+        index = self.index(row, self.PROGRESS)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole])
+
+
+class PackageFilterProxyModel(QSortFilterProxyModel):
+    """Filters rows by title, tag or version; sorting is left to the source model."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._filter = ""
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sourceModel().sort(column, order)
+
+    def set_filter_text(self, text):
+        self._filter = text.strip().lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if not self._filter:
+            return True
+        return self._filter in self.sourceModel().search_text(source_row)
@@ -1,5 +1,11 @@
-from . import DownloadThread
-from . import FetchThread
-from . import ConfigDialog
+import importlib
 
-__all__ = ['DownloadThread', 'FetchThread', 'ConfigDialog']
+__all__ = ['DownloadThread', 'FetchThread', 'ConfigDialog', 'PackageTableModel', 'LogView']
+
+
+def __getattr__(name):
+    # Submodules pull in requests and the core package, so they are only
+    # imported on first use to keep startup fast
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")